@@ -1,33 +1,821 @@
-from typing import Any
+from typing import (
+    Any,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+)
 import abc
+import asyncio
+import contextlib
 import os
+import sys
 import time
 
 import alter_ego.structure
 import alter_ego.utils
+import alter_ego.utils.breaker
+import alter_ego.utils.cache
+import alter_ego.utils.concurrency
+import alter_ego.utils.hedging
+import alter_ego.utils.metrics
+import alter_ego.utils.pricing
+import alter_ego.utils.ratelimit
+import alter_ego.utils.records
+import alter_ego.utils.retry
 
 
 class APIThread(alter_ego.structure.Thread, abc.ABC):
     """
     Abstract base class representing any Thread accessible using an API.
+
+    :cvar PROVIDER: Name of the provider, used to share rate limits and other
+        process-wide state between Threads.
     """
 
+    PROVIDER = "api"
+    MAX_N = 128  # most responses the provider returns from a single request
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         """
         Initialize the APIThread.
 
         :param args: Additional arguments.
         :type args: Any
-        :param kwargs: Additional keyword arguments, includes `api_key`, `delay`, and `verbose`.
+        :param kwargs: Additional keyword arguments, includes `api_key`, `delay`
+            (minimum number of seconds between two requests of this Thread), `retries`
+            (number of retries after transient errors), `backoff` and `max_backoff`
+            (base and cap of the exponential backoff in seconds), `use_cache` (whether
+            the response cache, if enabled, applies to this Thread), `hedge` (latency
+            quantile, e.g., 0.95, after which a duplicate request is fired; None to
+            disable hedging), `hedge_delay` (seconds to use instead while fewer than
+            `hedge_min_samples` latencies have been observed), `keep_raw` (whether to
+            retain raw responses and exceptions in the log), `failover` (OpenRouter
+            model to use while the provider's circuit breaker is open) with
+            `failover_options` (further arguments for that OpenRouterThread), and
+            `verbose`. Beyond what `verbose` prints, every call is recorded in
+            alter_ego.utils.metrics.
         :type kwargs: Any
         """
-        self.log = []  # Initialize log
+        self.log: List[alter_ego.utils.records.CallRecord] = []  # Initialize log
+        self.spent = 0.0  # running total of call costs in USD
 
         self.delay = kwargs.get("delay", 0)
+        self.retries = kwargs.get("retries", 3)
+        self.backoff = kwargs.get("backoff", 1.0)
+        self.max_backoff = kwargs.get("max_backoff", 60.0)
+        self.use_cache = kwargs.get("use_cache", True)
+        self.hedge = kwargs.get("hedge", None)
+        self.hedge_delay = kwargs.get("hedge_delay", None)
+        self.hedge_min_samples = kwargs.get("hedge_min_samples", 20)
+        self.keep_raw = kwargs.get("keep_raw", False)
+        self.failover = kwargs.get("failover", None)
+        self.failover_options = kwargs.get("failover_options", {})
         self.verbose = kwargs.get("verbose", False)
+        self.last_request = 0.0
 
         super().__init__(*args, **kwargs)
 
+    def fork(self) -> "APIThread":
+        """
+        Creates an independent copy of this Thread with a new id and an empty log,
+        so that calls made before forking are only accounted for in this Thread.
+
+        :return: The fork.
+        :rtype: APIThread
+        """
+        new = super().fork()
+        new.log = []
+        new.spent = 0.0
+
+        return new
+
+    def request_choices(
+        self, get_output: Callable[[int], Any], n: int, max_tokens: Optional[int]
+    ) -> List[Any]:
+        """
+        Obtain n choices from as few requests as possible: at most MAX_N per
+        request, with further requests if the provider returns fewer choices than
+        requested (many ignore n).
+
+        :param get_output: Performs an attempt for a given number of choices, e.g.,
+            by calling get_model_output.
+        :type get_output: Callable[[int], Any]
+        :param n: Number of choices.
+        :type n: int
+        :param max_tokens: Maximum number of tokens for each choice.
+        :type max_tokens: Optional[int]
+        :return: The choices.
+        :rtype: List[Any]
+        :raises RuntimeError: If the provider returns no choices.
+        """
+        choices: List[Any] = []
+
+        while len(choices) < n:
+            k = min(n - len(choices), self.MAX_N)
+            llm_out = self.request(lambda: get_output(k), max_tokens, n=k)
+
+            if not llm_out.choices:
+                raise RuntimeError(f"{self.PROVIDER} returned no choices.")
+
+            choices.extend(llm_out.choices[:k])
+
+        return choices
+
+    def log_call(
+        self,
+        outcome: Any,
+        started: Optional[float] = None,
+        cached: bool = False,
+        batch: bool = False,
+    ) -> alter_ego.utils.records.CallRecord:
+        """
+        Append a compact record of a call to the log.
+
+        :param outcome: The response or exception.
+        :type outcome: Any
+        :param started: Time the call started (time.time()), None if unknown.
+        :type started: Optional[float]
+        :param cached: Whether the response was served from the response cache.
+        :type cached: bool
+        :param batch: Whether the call was made through the Batch API.
+        :type batch: bool
+        :return: The record.
+        :rtype: alter_ego.utils.records.CallRecord
+        """
+        now = time.time()
+        record = alter_ego.utils.records.CallRecord.from_outcome(
+            outcome,
+            now if started is None else started,
+            None if started is None else now - started,
+            getattr(self, "model", None),
+            cached,
+            self.keep_raw,
+        )
+
+        record.cost = self.call_cost(record, batch)
+
+        self.log.append(record)
+        self.spent += record.cost
+
+        alter_ego.utils.metrics.metrics.observe(
+            self.PROVIDER, getattr(self, "model", None), record
+        )
+
+        return record
+
+    def call_cost(
+        self, record: alter_ego.utils.records.CallRecord, batch: bool = False
+    ) -> float:
+        """
+        Cost of a call according to alter_ego.utils.pricing. Responses served
+        from the response cache and failed calls without usage are counted as
+        free; failed calls with usage (e.g., responses cut off by the length
+        limit) are charged.
+
+        :param record: Record of the call.
+        :type record: alter_ego.utils.records.CallRecord
+        :param batch: Whether the call was made through the Batch API.
+        :type batch: bool
+        :return: Cost in USD.
+        :rtype: float
+        """
+        if record.cached:
+            return 0.0
+
+        return alter_ego.utils.pricing.call_cost(
+            self.PROVIDER,
+            record.model,
+            record.prompt_tokens,
+            record.completion_tokens,
+            batch,
+        )
+
+    def cost(self) -> float:
+        """
+        :return: Total cost of this Thread's calls in USD.
+        :rtype: float
+        """
+        if "spent" not in self.__dict__:  # saved by an earlier version
+            self.spent = sum(
+                self.call_cost(
+                    alter_ego.utils.records.as_record(e, getattr(self, "model", None))
+                )
+                for e in self.log
+            )
+
+        return self.spent
+
+    def usage(self) -> Dict[str, Any]:
+        """
+        :return: Cost, numbers of calls, failed calls and cache hits, and token
+            counts of this Thread.
+        :rtype: Dict[str, Any]
+        """
+        records = [
+            alter_ego.utils.records.as_record(e, getattr(self, "model", None))
+            for e in self.log
+        ]
+
+        return dict(
+            cost=self.cost(),
+            calls=len(records),
+            errors=sum(not r.ok for r in records),
+            cached=sum(r.cached for r in records),
+            prompt_tokens=sum(r.prompt_tokens or 0 for r in records),
+            completion_tokens=sum(r.completion_tokens or 0 for r in records),
+        )
+
+    @classmethod
+    def set_rate_limit(
+        cls,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        model: Optional[str] = None,
+    ) -> alter_ego.utils.ratelimit.RateLimiter:
+        """
+        Configure the rate limit shared by all Threads of this provider (or model).
+
+        :param rpm: Requests per minute, None for no limit.
+        :type rpm: Optional[float]
+        :param tpm: Estimated tokens per minute, None for no limit.
+        :type tpm: Optional[float]
+        :param model: Restrict the limit to this model.
+        :type model: Optional[str]
+        :return: The new limiter.
+        :rtype: alter_ego.utils.ratelimit.RateLimiter
+        """
+        return alter_ego.utils.ratelimit.set_rate_limit(
+            cls.PROVIDER, model, rpm=rpm, tpm=tpm
+        )
+
+    @classmethod
+    def set_circuit_breaker(
+        cls, threshold: int = 5, window: float = 30.0, cooldown: float = 30.0
+    ) -> alter_ego.utils.breaker.CircuitBreaker:
+        """
+        Enable a circuit breaker shared by all Threads of this provider. Once it
+        opens, requests fail immediately (or fail over) instead of timing out.
+
+        :param threshold: Number of transient failures that opens the breaker.
+        :type threshold: int
+        :param window: Seconds within which failures are counted.
+        :type window: float
+        :param cooldown: Seconds until a probe request is let through.
+        :type cooldown: float
+        :return: The new breaker.
+        :rtype: alter_ego.utils.breaker.CircuitBreaker
+        """
+        return alter_ego.utils.breaker.set_breaker(
+            cls.PROVIDER, threshold, window, cooldown
+        )
+
+    @classmethod
+    def set_adaptive_concurrency(
+        cls,
+        initial: float = 4,
+        minimum: float = 1,
+        maximum: float = 64,
+        **kwargs: Any,
+    ) -> alter_ego.utils.concurrency.AdaptiveLimiter:
+        """
+        Limit the number of concurrent requests of all Threads of this provider,
+        adapting the limit to the provider: it grows while latency is healthy and
+        halves on rate limits (429) and timeouts.
+
+        :param initial: Initial limit.
+        :type initial: float
+        :param minimum: Lowest limit.
+        :type minimum: float
+        :param maximum: Highest limit.
+        :type maximum: float
+        :param kwargs: Passed to alter_ego.utils.concurrency.AdaptiveLimiter.
+        :type kwargs: Any
+        :return: The new limiter.
+        :rtype: alter_ego.utils.concurrency.AdaptiveLimiter
+        """
+        return alter_ego.utils.concurrency.set_adaptive_concurrency(
+            cls.PROVIDER, initial=initial, minimum=minimum, maximum=maximum, **kwargs
+        )
+
+    @property
+    def concurrency_limiter(
+        self,
+    ) -> Optional[alter_ego.utils.concurrency.AdaptiveLimiter]:
+        """
+        :return: The adaptive concurrency limiter of this provider, if enabled.
+        """
+        return alter_ego.utils.concurrency.get_concurrency_limiter(self.PROVIDER)
+
+    def concurrency_slot(self) -> ContextManager[None]:
+        """
+        :return: Context manager holding a slot of the concurrency limiter, if
+            enabled, for the duration of an attempt.
+        :rtype: ContextManager[None]
+        """
+        if (limiter := self.concurrency_limiter) is None:
+            return contextlib.nullcontext()
+
+        return limiter.slot()
+
+    def aconcurrency_slot(self) -> AsyncContextManager[None]:
+        """
+        Asynchronous version of concurrency_slot.
+        """
+        if (limiter := self.concurrency_limiter) is None:
+            return alter_ego.utils.concurrency.unlimited()
+
+        return limiter.aslot()
+
+    @property
+    def circuit_breaker(self) -> Optional[alter_ego.utils.breaker.CircuitBreaker]:
+        """
+        :return: The circuit breaker of this provider, if enabled.
+        """
+        return alter_ego.utils.breaker.get_breaker(self.PROVIDER)
+
+    def circuit_allows(self, probe: bool = True) -> bool:
+        """
+        :param probe: Whether to claim the probe request of a half-open breaker.
+        :type probe: bool
+        :return: Whether a request may be sent to the provider now.
+        :rtype: bool
+        """
+        if (breaker := self.circuit_breaker) is None:
+            return True
+        elif not probe:
+            return breaker.state != alter_ego.utils.breaker.OPEN
+
+        return breaker.allow()
+
+    def circuit_record(self, exc: Optional[BaseException]) -> None:
+        """
+        Report the outcome of an attempt to the circuit breaker. Only transient
+        errors count as failures.
+
+        :param exc: The exception raised by the attempt, None if it succeeded.
+        :type exc: Optional[BaseException]
+        """
+        if (breaker := self.circuit_breaker) is None:
+            return
+
+        if exc is not None and alter_ego.utils.retry.is_transient(exc):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def failover_thread(self) -> "APIThread":
+        """
+        :return: An OpenRouterThread with the failover model and this Thread's
+            history.
+        :rtype: APIThread
+        :raises CircuitOpen: If no failover model is configured.
+        """
+        if self.failover is None:
+            raise alter_ego.utils.breaker.CircuitOpen(
+                f"Circuit breaker for {self.PROVIDER} is open."
+            )
+
+        from alter_ego.agents.OpenRouterThread import OpenRouterThread
+
+        fallback = OpenRouterThread(
+            self.failover,
+            getattr(self, "temperature", 1.0),
+            verbose=self.verbose,
+            **self.failover_options,
+        )
+        fallback._history = list(self._history)
+
+        return fallback
+
+    def from_failover(self, llm_out: Any) -> Any:
+        """
+        Convert a response of the failover model into the format of this Thread's
+        model outputs.
+
+        :param llm_out: Chat completion returned by OpenRouterThread.
+        :type llm_out: Any
+        :return: The converted output, by default unchanged (OpenAI format).
+        :rtype: Any
+        """
+        return llm_out
+
+    def _failed_over(self, fallback: "APIThread", llm_out: Any) -> Any:
+        self.log.extend(fallback.log)
+        self.spent += fallback.cost()
+
+        alter_ego.utils.metrics.metrics.count(
+            self.PROVIDER, getattr(self, "model", None), "failovers"
+        )
+        self.metadata.setdefault("failover", []).append(
+            dict(
+                t=time.time(),
+                provider=self.PROVIDER,
+                model=getattr(self, "model", None),
+                to=f"{fallback.PROVIDER}/{fallback.model}",
+            )
+        )
+
+        return self.from_failover(llm_out)
+
+    def fail_over(self, max_tokens: Optional[int] = None) -> Any:
+        """
+        Obtain the next response from the failover model on OpenRouter instead of
+        this Thread's provider. The switch is recorded in metadata["failover"].
+
+        :param max_tokens: Maximum number of tokens for the completion.
+        :type max_tokens: Optional[int]
+        :return: The response, converted by from_failover.
+        :rtype: Any
+        :raises CircuitOpen: If no failover model is configured.
+        """
+        fallback = self.failover_thread()
+        message = self._history[-1]["content"] if self._history else ""
+        max_tokens = max_tokens or 500
+
+        llm_out = fallback.request(
+            lambda: fallback.get_model_output(message, max_tokens), max_tokens
+        )
+
+        return self._failed_over(fallback, llm_out)
+
+    async def afail_over(self, max_tokens: Optional[int] = None) -> Any:
+        """
+        Asynchronous version of fail_over.
+        """
+        fallback = self.failover_thread()
+        message = self._history[-1]["content"] if self._history else ""
+        max_tokens = max_tokens or 500
+
+        llm_out = await fallback.arequest(
+            lambda: fallback.aget_model_output(message, max_tokens), max_tokens
+        )
+
+        return self._failed_over(fallback, llm_out)
+
+    @property
+    def rate_limiter(self) -> Optional[alter_ego.utils.ratelimit.RateLimiter]:
+        """
+        :return: The shared rate limiter applicable to this Thread, if any.
+        """
+        return alter_ego.utils.ratelimit.get_limiter(
+            self.PROVIDER, getattr(self, "model", None)
+        )
+
+    def estimate_tokens(self, max_tokens: Optional[int] = None) -> int:
+        """
+        Roughly estimate the tokens a request will consume (prompt and completion).
+
+        :param max_tokens: Maximum number of tokens for the completion.
+        :type max_tokens: Optional[int]
+        :return: Estimated number of tokens.
+        :rtype: int
+        """
+        prompt = sum(len(item["content"]) for item in self._history) // 4
+
+        return prompt + (max_tokens or 0)
+
+    def _pacing(self) -> float:
+        return max(0.0, self.last_request + self.delay - time.time())
+
+    def rate_limit_wait(self, max_tokens: Optional[int] = None) -> float:
+        """
+        :return: Seconds the next request of this Thread would currently have to wait.
+        :rtype: float
+        """
+        limiter = self.rate_limiter
+        tokens = self.estimate_tokens(max_tokens)
+
+        return max(self._pacing(), limiter.wait_time(tokens) if limiter else 0.0)
+
+    def throttle(self, max_tokens: Optional[int] = None) -> float:
+        """
+        Wait just as long as the rate limit and `delay` require before a request.
+
+        :param max_tokens: Maximum number of tokens for the completion.
+        :type max_tokens: Optional[int]
+        :return: Seconds waited.
+        :rtype: float
+        """
+        waited = self._pacing()
+        time.sleep(waited)
+
+        if (limiter := self.rate_limiter) is not None:
+            waited += limiter.acquire(self.estimate_tokens(max_tokens))
+
+        self.last_request = time.time()
+
+        return waited
+
+    async def athrottle(self, max_tokens: Optional[int] = None) -> float:
+        """
+        Asynchronous version of throttle.
+
+        :param max_tokens: Maximum number of tokens for the completion.
+        :type max_tokens: Optional[int]
+        :return: Seconds waited.
+        :rtype: float
+        """
+        waited = self._pacing()
+        await asyncio.sleep(waited)
+
+        if (limiter := self.rate_limiter) is not None:
+            waited += await limiter.aacquire(self.estimate_tokens(max_tokens))
+
+        self.last_request = time.time()
+
+        return waited
+
+    def retry_wait(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """
+        Decide whether to retry after a failed request, and how long to wait.
+
+        :param exc: The exception raised by the request.
+        :type exc: BaseException
+        :param attempt: Number of the failed attempt, starting at 0.
+        :type attempt: int
+        :return: Seconds to wait before retrying, or None to give up.
+        :rtype: Optional[float]
+        """
+        if attempt >= self.retries or not alter_ego.utils.retry.is_transient(exc):
+            return None
+
+        wait = alter_ego.utils.retry.backoff(attempt, self.backoff, self.max_backoff)
+
+        if (requested := alter_ego.utils.retry.retry_after(exc)) is not None:
+            wait = max(wait, requested)
+
+        if self.verbose:
+            print("!", end="", file=sys.stderr, flush=True)
+
+        return wait
+
+    @property
+    def latency_tracker(self) -> alter_ego.utils.hedging.LatencyTracker:
+        """
+        :return: Latencies and hedging statistics shared by all Threads of this
+            provider and model.
+        """
+        return alter_ego.utils.hedging.get_tracker(
+            self.PROVIDER, getattr(self, "model", None)
+        )
+
+    @classmethod
+    def hedge_stats(cls, model: Optional[str] = None) -> Dict[str, Any]:
+        """
+        :param model: Model name.
+        :type model: Optional[str]
+        :return: Numbers of requests, hedged requests and hedges that won, and the
+            hedge rate of this provider (and model).
+        :rtype: Dict[str, Any]
+        """
+        return alter_ego.utils.hedging.get_tracker(cls.PROVIDER, model).stats()
+
+    def hedge_after(self) -> Optional[float]:
+        """
+        :return: Seconds after which a duplicate of a pending request is fired, None
+            if hedging is disabled or there is not enough data yet.
+        :rtype: Optional[float]
+        """
+        tracker = self.latency_tracker
+
+        if len(tracker.latencies) < self.hedge_min_samples:
+            return self.hedge_delay
+
+        return tracker.percentile(self.hedge)
+
+    def _before_hedge(self, max_tokens: Optional[int]) -> None:
+        if self.verbose:
+            print("~", end="", file=sys.stderr, flush=True)
+
+        if (limiter := self.rate_limiter) is not None:
+            limiter.acquire(self.estimate_tokens(max_tokens))
+
+    async def _abefore_hedge(self, max_tokens: Optional[int]) -> None:
+        if self.verbose:
+            print("~", end="", file=sys.stderr, flush=True)
+
+        if (limiter := self.rate_limiter) is not None:
+            await limiter.aacquire(self.estimate_tokens(max_tokens))
+
+    def attempt(
+        self, get_output: Callable[[], Any], max_tokens: Optional[int] = None
+    ) -> Any:
+        """
+        Perform a single attempt of a request, hedged if enabled: if the response
+        takes longer than hedge_after(), a duplicate is fired and whichever response
+        arrives first is used.
+
+        :param get_output: Performs the attempt, e.g., by calling get_model_output.
+        :type get_output: Callable[[], Any]
+        :param max_tokens: Maximum number of tokens for the completion.
+        :type max_tokens: Optional[int]
+        :return: Return value of get_output.
+        :rtype: Any
+        """
+        if self.hedge is None:
+            return get_output()
+
+        return alter_ego.utils.hedging.hedged_call(
+            get_output,
+            self.hedge_after(),
+            self.latency_tracker,
+            lambda: self._before_hedge(max_tokens),
+        )
+
+    async def aattempt(
+        self,
+        get_output: Callable[[], Awaitable[Any]],
+        max_tokens: Optional[int] = None,
+    ) -> Any:
+        """
+        Asynchronous version of attempt. A duplicate that is cancelled because
+        the original request finished first is logged (and charged) with the
+        usage of the response that was used.
+        """
+        if self.hedge is None:
+            return await get_output()
+
+        return await alter_ego.utils.hedging.ahedged_call(
+            get_output,
+            self.hedge_after(),
+            self.latency_tracker,
+            lambda: self._abefore_hedge(max_tokens),
+            self.log_call,
+        )
+
+    def cache_key(self, max_tokens: Optional[int] = None, **params: Any) -> str:
+        """
+        Key of the next request in the response cache.
+
+        :param max_tokens: Maximum number of tokens for the completion.
+        :type max_tokens: Optional[int]
+        :param params: Further parameters that affect the response.
+        :type params: Any
+        :return: The key.
+        :rtype: str
+        """
+        return alter_ego.utils.cache.ResponseCache.key(
+            provider=self.PROVIDER,
+            model=getattr(self, "model", None),
+            messages=self._history,
+            temperature=getattr(self, "temperature", None),
+            max_tokens=max_tokens,
+            options=params,
+        )
+
+    def _cache(self) -> Optional[alter_ego.utils.cache.ResponseCache]:
+        return alter_ego.utils.cache.get_cache() if self.use_cache else None
+
+    def _request_key(
+        self,
+        cache: alter_ego.utils.cache.ResponseCache,
+        max_tokens: Optional[int],
+        **params: Any,
+    ) -> str:
+        key = self.cache_key(max_tokens, **params)
+
+        if getattr(self, "temperature", None) != 0:  # sampled, see occurrence_key
+            key = cache.occurrence_key(key)
+
+        return key
+
+    def request(
+        self,
+        get_output: Callable[[], Any],
+        max_tokens: Optional[int] = None,
+        cacheable: bool = True,
+        **params: Any,
+    ) -> Any:
+        """
+        Perform a request, throttled (see also set_adaptive_concurrency) and
+        retried after transient errors. If the response cache is enabled,
+        responses are served from and stored in it; unless the temperature is 0,
+        repeated identical requests are cached separately (see
+        ResponseCache.occurrence_key). If the provider's circuit breaker is open,
+        the request fails over (see fail_over).
+
+        :param get_output: Performs a single attempt, e.g., by calling get_model_output.
+        :type get_output: Callable[[], Any]
+        :param max_tokens: Maximum number of tokens for the completion.
+        :type max_tokens: Optional[int]
+        :param cacheable: Whether the response may be served from and stored in
+            the cache, e.g., False if it depends on a callback.
+        :type cacheable: bool
+        :param params: Further parameters that affect the response (for the cache key).
+        :type params: Any
+        :return: Return value of get_output.
+        :rtype: Any
+        """
+        if (cache := self._cache() if cacheable else None) is not None:
+            key = self._request_key(cache, max_tokens, **params)
+
+            if (cached := cache.get(key)) is not None:
+                self.log_call(cached, cached=True)
+
+                return cached
+
+        attempt = 0
+        labels = (self.PROVIDER, getattr(self, "model", None))
+
+        while True:
+            if not self.circuit_allows():
+                return self.fail_over(max_tokens)
+
+            self.throttle(max_tokens)
+
+            try:
+                with self.concurrency_slot():
+                    with alter_ego.utils.metrics.metrics.in_flight(*labels):
+                        llm_out = self.attempt(get_output, max_tokens)
+
+                self.circuit_record(None)
+                break
+            except Exception as e:
+                self.circuit_record(e)
+
+                if (wait := self.retry_wait(e, attempt)) is None:
+                    raise
+
+                alter_ego.utils.metrics.metrics.count(*labels, "retries")
+
+                if self.circuit_allows(probe=False):
+                    time.sleep(wait)
+
+                attempt += 1
+
+        if cache is not None:
+            cache.put(key, llm_out)
+
+        return llm_out
+
+    async def arequest(
+        self,
+        get_output: Callable[[], Awaitable[Any]],
+        max_tokens: Optional[int] = None,
+        cacheable: bool = True,
+        **params: Any,
+    ) -> Any:
+        """
+        Asynchronous version of request.
+
+        :param get_output: Performs a single attempt, e.g., by calling aget_model_output.
+        :type get_output: Callable[[], Awaitable[Any]]
+        :param max_tokens: Maximum number of tokens for the completion.
+        :type max_tokens: Optional[int]
+        :param cacheable: Whether the response may be served from and stored in
+            the cache, e.g., False if it depends on a callback.
+        :type cacheable: bool
+        :param params: Further parameters that affect the response (for the cache key).
+        :type params: Any
+        :return: Return value of get_output.
+        :rtype: Any
+        """
+        if (cache := self._cache() if cacheable else None) is not None:
+            key = self._request_key(cache, max_tokens, **params)
+
+            if (cached := cache.get(key)) is not None:
+                self.log_call(cached, cached=True)
+
+                return cached
+
+        attempt = 0
+        labels = (self.PROVIDER, getattr(self, "model", None))
+
+        while True:
+            if not self.circuit_allows():
+                return await self.afail_over(max_tokens)
+
+            await self.athrottle(max_tokens)
+
+            try:
+                async with self.aconcurrency_slot():
+                    with alter_ego.utils.metrics.metrics.in_flight(*labels):
+                        llm_out = await self.aattempt(get_output, max_tokens)
+
+                self.circuit_record(None)
+                break
+            except Exception as e:
+                self.circuit_record(e)
+
+                if (wait := self.retry_wait(e, attempt)) is None:
+                    raise
+
+                alter_ego.utils.metrics.metrics.count(*labels, "retries")
+
+                if self.circuit_allows(probe=False):
+                    await asyncio.sleep(wait)
+
+                attempt += 1
+
+        if cache is not None:
+            cache.put(key, llm_out)
+
+        return llm_out
+
     @abc.abstractmethod
     def send(
         self, role: str, message: str, max_tokens: int = 500, **kwargs: Any
@@ -61,3 +849,17 @@ class APIThread(alter_ego.structure.Thread, abc.ABC):
         :rtype: Any
         """
         pass
+
+    async def aget_model_output(self, message: str, max_tokens: int) -> Any:
+        """
+        Asynchronously get the model's output. By default, get_model_output
+        is run in a worker thread; subclasses should provide a native version.
+
+        :param message: The input message to the model.
+        :type message: str
+        :param max_tokens: Maximum number of tokens for the output.
+        :type max_tokens: int
+        :return: The model's output.
+        :rtype: Any
+        """
+        return await asyncio.to_thread(self.get_model_output, message, max_tokens)
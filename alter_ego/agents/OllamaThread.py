@@ -1,10 +1,15 @@
-from ollama import Client
+from ollama import AsyncClient, Client
 
+import asyncio
+import requests
 import sys
 import time
 
 from alter_ego.agents import APIThread
-from typing import Any, Dict, List, Optional
+import alter_ego.utils.balancer
+import alter_ego.utils.clients
+import alter_ego.utils.streaming
+from typing import Any, Callable, Dict, List, Optional
 
 
 class OllamaThread(APIThread):
@@ -12,19 +17,55 @@ class OllamaThread(APIThread):
     Class representing a Ollama Thread.
     """
 
+    PROVIDER = "ollama"
+
     def __init__(self, **kwargs: Any):
         """
         Initialize the OllamaThread.
 
-        :keyword kwargs: Additional keyword arguments.
+        :keyword kwargs: Additional keyword arguments, includes `endpoint` (URL of
+            the Ollama server) or `endpoints` (list of URLs of equivalent servers,
+            each request is routed to the least-loaded healthy one).
         :type kwargs: Any
         """
         # defaults
         self.endpoint = "http://localhost:11434"
+        self.endpoints = None
         self.timeout = 60
 
         super().__init__(**kwargs)
 
+    @staticmethod
+    def health_check(endpoint: str) -> bool:
+        """
+        Check whether an Ollama server is reachable.
+
+        :param endpoint: URL of the server.
+        :type endpoint: str
+        :return: Whether the server responded.
+        :rtype: bool
+        """
+        return requests.get(f"{endpoint}/api/version", timeout=5).ok
+
+    @property
+    def balancer(self) -> alter_ego.utils.balancer.LoadBalancer:
+        """
+        :return: The load balancer shared by all Threads using the same endpoints.
+        """
+        return alter_ego.utils.balancer.get_balancer(
+            self.endpoints or [self.endpoint], self.health_check
+        )
+
+    def _get_client(self, endpoint: str, asynchronous: bool = False):
+        """Get the pooled (a)synchronous Ollama client for an endpoint."""
+        return alter_ego.utils.clients.get_client(
+            ("ollama", endpoint, self.timeout),
+            lambda: (AsyncClient if asynchronous else Client)(
+                host=endpoint, timeout=self.timeout
+            ),
+            asynchronous,
+        )
+
     def ollama_data(self) -> List[Dict[str, str]]:
         """
         Prepare the data for Ollama API call.
@@ -58,6 +99,8 @@ class OllamaThread(APIThread):
         role: str,
         message: str,
         options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
         **kwargs: Any,
     ) -> str:
         """
@@ -71,15 +114,67 @@ class OllamaThread(APIThread):
         :type max_tokens: int
         :param extra_params: Additional parameters for the model.
         :type extra_params: Optional[Dict[str, Any]]
+        :param stream: Whether to stream the response.
+        :type stream: bool
+        :param stop_when: Predicate on the text received so far. If given, the
+            response is streamed and cancelled as soon as the predicate holds; the
+            text received up to then is memorized. Such responses are not cached.
+        :type stop_when: Optional[Callable[[str], bool]]
         :keyword kwargs: Additional keyword arguments.
         :type kwargs: Any
         :return: The model's response.
         :rtype: str
         """
         if role == "user":
-            time.sleep(self.delay)
+            llm_out = self.request(
+                lambda: self.get_model_output(message, options, stream, stop_when),
+                options=options,
+                stream=stream,
+                cacheable=stop_when is None,  # predicates have no stable key
+            )
 
-            llm_out = self.get_model_output(message, options)
+            response = llm_out["message"]["content"]
+
+            self.memorize("assistant", response)
+
+            return response
+
+    async def asend(
+        self,
+        role: str,
+        message: str,
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Asynchronously submit the user message, receive the model's response, and memorize it.
+
+        :param role: Role of the sender ("user").
+        :type role: str
+        :param message: The user's message.
+        :type message: str
+        :param options: Additional options for the model.
+        :type options: Optional[Dict[str, Any]]
+        :param stream: Whether to stream the response.
+        :type stream: bool
+        :param stop_when: Predicate on the text received so far. If given, the
+            response is streamed and cancelled as soon as the predicate holds; the
+            text received up to then is memorized. Such responses are not cached.
+        :type stop_when: Optional[Callable[[str], bool]]
+        :keyword kwargs: Additional keyword arguments.
+        :type kwargs: Any
+        :return: The model's response.
+        :rtype: str
+        """
+        if role == "user":
+            llm_out = await self.arequest(
+                lambda: self.aget_model_output(message, options, stream, stop_when),
+                options=options,
+                stream=stream,
+                cacheable=stop_when is None,  # predicates have no stable key
+            )
 
             response = llm_out["message"]["content"]
 
@@ -87,10 +182,27 @@ class OllamaThread(APIThread):
 
             return response
 
+    def from_failover(self, llm_out: Any) -> Dict[str, Any]:
+        """
+        Convert a chat completion of the failover model into this Thread's format.
+
+        :param llm_out: Chat completion returned by OpenRouterThread.
+        :type llm_out: Any
+        :return: The converted output.
+        :rtype: Dict[str, Any]
+        """
+        return dict(
+            model=llm_out.model,
+            message=dict(role="assistant", content=llm_out.choices[0].message.content),
+            done_reason=llm_out.choices[0].finish_reason,
+        )
+
     def get_model_output(
         self,
         message: str,
         options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
     ) -> Any:
         """
         Get the model output for the given message.
@@ -101,23 +213,96 @@ class OllamaThread(APIThread):
         :type max_tokens: int
         :param extra_params: Additional parameters for the model.
         :type extra_params: Optional[Dict[str, Any]]
+        :param stream: Whether to stream the response.
+        :type stream: bool
+        :param stop_when: Predicate on the text received so far, cancels the stream.
+        :type stop_when: Optional[Callable[[str], bool]]
         :return: The model output.
         :rtype: Any
         """
 
+        started = time.time()
+
         try:
             if self.verbose:
                 print("+", end="", file=sys.stderr, flush=True)
 
-            client = Client(host=self.endpoint, timeout=self.timeout)
+            with self.balancer.use() as endpoint:
+                client = self._get_client(endpoint)
 
-            llm_out = client.chat(
-                model=self.model, messages=self.ollama_data(), options=options
-            )
-            self.log.append(llm_out)
+                if stream or stop_when is not None:
+                    llm_out = alter_ego.utils.streaming.collect_ollama(
+                        client.chat(
+                            model=self.model,
+                            messages=self.ollama_data(),
+                            options=options,
+                            stream=True,
+                        ),
+                        stop_when,
+                    )
+                else:
+                    llm_out = client.chat(
+                        model=self.model, messages=self.ollama_data(), options=options
+                    )
+
+            self.log_call(llm_out, started)
+
+            return llm_out
+        except Exception as e:
+            self.log_call(e, started)
+
+            raise e  # re-raise
+
+    async def aget_model_output(
+        self,
+        message: str,
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
+    ) -> Any:
+        """
+        Asynchronously get the model output for the given message.
+
+        :param message: The user's message.
+        :type message: str
+        :param options: Additional options for the model.
+        :type options: Optional[Dict[str, Any]]
+        :param stream: Whether to stream the response.
+        :type stream: bool
+        :param stop_when: Predicate on the text received so far, cancels the stream.
+        :type stop_when: Optional[Callable[[str], bool]]
+        :return: The model output.
+        :rtype: Any
+        """
+
+        started = time.time()
+
+        try:
+            if self.verbose:
+                print("+", end="", file=sys.stderr, flush=True)
+
+            with self.balancer.use() as endpoint:
+                client = self._get_client(endpoint, asynchronous=True)
+
+                if stream or stop_when is not None:
+                    llm_out = await alter_ego.utils.streaming.acollect_ollama(
+                        await client.chat(
+                            model=self.model,
+                            messages=self.ollama_data(),
+                            options=options,
+                            stream=True,
+                        ),
+                        stop_when,
+                    )
+                else:
+                    llm_out = await client.chat(
+                        model=self.model, messages=self.ollama_data(), options=options
+                    )
+
+            self.log_call(llm_out, started)
 
             return llm_out
         except Exception as e:
-            self.log.append(e)
+            self.log_call(e, started)
 
             raise e  # re-raise
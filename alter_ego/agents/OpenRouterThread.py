@@ -1,4 +1,5 @@
-from typing import Any
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
 import openai
 import os
 import sys
@@ -6,14 +7,22 @@ import time
 
 from alter_ego.agents import APIThread
 import alter_ego.utils
+import alter_ego.utils.clients
+import alter_ego.utils.retry
+import alter_ego.utils.streaming
+
+FINISHED = ("stop", alter_ego.utils.streaming.EARLY_STOP)
 
 
 class OpenRouterThread(APIThread):
     """
     Class representing an OpenRouter Thread.
     OpenRouter provides access to many LLMs through an OpenAI-compatible API.
+    Pass BASE_URL to the constructor to use another such API, e.g., a mock server.
     """
 
+    PROVIDER = "openrouter"
+
     BASE_URL = "https://openrouter.ai/api/v1"
 
     def __init__(self, model, temperature, *args, **kwargs) -> None:
@@ -22,11 +31,16 @@ class OpenRouterThread(APIThread):
         if "api_key" not in kwargs:
             self.api_key = self.get_api_key()
 
-    def _get_client(self):
-        """Create OpenAI client on demand (avoids pickling issues)."""
-        return openai.OpenAI(
-            base_url=self.BASE_URL,
-            api_key=self.api_key,
+    def _get_client(self, asynchronous: bool = False):
+        """Get the pooled (a)synchronous OpenAI client (not stored, avoids pickling issues)."""
+        return alter_ego.utils.clients.get_client(
+            ("openai", self.BASE_URL, self.api_key),
+            lambda: (openai.AsyncOpenAI if asynchronous else openai.OpenAI)(
+                base_url=self.BASE_URL,
+                api_key=self.api_key,
+                max_retries=0,  # retries are handled by APIThread
+            ),
+            asynchronous,
         )
 
     def get_api_key(self) -> str:
@@ -49,7 +63,13 @@ class OpenRouterThread(APIThread):
             )
 
     def send(
-        self, role: str, message: str, max_tokens: int = 500, **kwargs: Any
+        self,
+        role: str,
+        message: str,
+        max_tokens: int = 500,
+        stream: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
+        **kwargs: Any,
     ) -> str:
         """
         Submit the user message, get the response from the model, and memorize it.
@@ -60,15 +80,67 @@ class OpenRouterThread(APIThread):
         :type message: str
         :param max_tokens: Maximum number of tokens for the model to generate.
         :type max_tokens: int
+        :param stream: Whether to stream the response.
+        :type stream: bool
+        :param stop_when: Predicate on the text received so far. If given, the
+            response is streamed and cancelled as soon as the predicate holds; the
+            text received up to then is memorized. Such responses are not cached.
+        :type stop_when: Optional[Callable[[str], bool]]
         :keyword kwargs: Additional keyword arguments.
         :type kwargs: Any
         :return: The model's response.
         :rtype: str
         """
         if role == "user":
-            time.sleep(self.delay)
+            llm_out = self.request(
+                lambda: self.get_model_output(message, max_tokens, stream, stop_when),
+                max_tokens,
+                stream=stream,
+                cacheable=stop_when is None,  # predicates have no stable key
+            )
+
+            response = llm_out.choices[0].message.content
 
-            llm_out = self.get_model_output(message, max_tokens)
+            self.memorize("assistant", response)
+
+            return response
+
+    async def asend(
+        self,
+        role: str,
+        message: str,
+        max_tokens: int = 500,
+        stream: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Asynchronously submit the user message, get the response from the model, and memorize it.
+
+        :param role: Role of the sender ("user").
+        :type role: str
+        :param message: The user's message to submit.
+        :type message: str
+        :param max_tokens: Maximum number of tokens for the model to generate.
+        :type max_tokens: int
+        :param stream: Whether to stream the response.
+        :type stream: bool
+        :param stop_when: Predicate on the text received so far. If given, the
+            response is streamed and cancelled as soon as the predicate holds; the
+            text received up to then is memorized. Such responses are not cached.
+        :type stop_when: Optional[Callable[[str], bool]]
+        :keyword kwargs: Additional keyword arguments.
+        :type kwargs: Any
+        :return: The model's response.
+        :rtype: str
+        """
+        if role == "user":
+            llm_out = await self.arequest(
+                lambda: self.aget_model_output(message, max_tokens, stream, stop_when),
+                max_tokens,
+                stream=stream,
+                cacheable=stop_when is None,  # predicates have no stable key
+            )
 
             response = llm_out.choices[0].message.content
 
@@ -76,7 +148,57 @@ class OpenRouterThread(APIThread):
 
             return response
 
-    def get_model_output(self, message: str, max_tokens: int) -> str:
+    def submit_n(
+        self, message: str, n: int, max_tokens: int = 500, **kwargs: Any
+    ) -> List[Tuple["OpenRouterThread", Optional[str]]]:
+        """
+        Submit the user message once and obtain n responses from a single request
+        (or a few, see request_choices). Each response is memorized in its own fork
+        of this Thread; the cost is only accounted for in this Thread.
+
+        :param message: The user's message to submit.
+        :type message: str
+        :param n: Number of responses.
+        :type n: int
+        :param max_tokens: Maximum number of tokens for each response.
+        :type max_tokens: int
+        :keyword kwargs: Additional keyword arguments for message preparation.
+        :type kwargs: Any
+        :return: Pairs of fork and response. The response is None (and not memorized)
+            if the model finished early.
+        :rtype: List[Tuple[OpenRouterThread, Optional[str]]]
+        """
+        self.memorize("user", m := self.prepare(message, **kwargs))
+
+        choices = self.request_choices(
+            lambda k: self.get_model_output(m, max_tokens, n=k), n, max_tokens
+        )
+
+        results = []
+
+        for choice in choices:
+            fork = self.fork()
+
+            if choice.finish_reason in FINISHED:
+                fork.memorize("assistant", response := choice.message.content)
+            else:
+                fork.log_call(
+                    alter_ego.utils.retry.FinishedEarly("Model finished early")
+                )
+                response = None
+
+            results.append((fork, response))
+
+        return results
+
+    def get_model_output(
+        self,
+        message: str,
+        max_tokens: int,
+        stream: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
+        n: int = 1,
+    ) -> str:
         """
         Get the model output for the given message.
 
@@ -84,30 +206,119 @@ class OpenRouterThread(APIThread):
         :type message: str
         :param max_tokens: Maximum number of tokens for the model to generate.
         :type max_tokens: int
+        :param stream: Whether to stream the response.
+        :type stream: bool
+        :param stop_when: Predicate on the text received so far, cancels the stream.
+        :type stop_when: Optional[Callable[[str], bool]]
+        :param n: Number of responses (choices) to generate, cannot be streamed.
+        :type n: int
         :return: The model output.
         :rtype: str
         """
+        started = time.time()
+
         try:
             if self.verbose:
                 print("+", end="", file=sys.stderr, flush=True)
 
             client = self._get_client()
-            llm_out = client.chat.completions.create(
+            params = dict(
+                model=self.model,
+                messages=self.history,
+                max_tokens=max_tokens,
+                n=n,
+                stop=None,
+                temperature=self.temperature,
+            )
+
+            if (stream or stop_when is not None) and n > 1:
+                raise ValueError("Multiple responses cannot be streamed.")
+            elif stream or stop_when is not None:
+                llm_out = alter_ego.utils.streaming.collect_openai(
+                    client.chat.completions.create(
+                        **params, stream=True, stream_options={"include_usage": True}
+                    ),
+                    stop_when,
+                    self.estimate_tokens(),
+                )
+            else:
+                llm_out = client.chat.completions.create(**params)
+
+            if n == 1 and llm_out.choices[0].finish_reason not in FINISHED:
+                raise alter_ego.utils.retry.FinishedEarly(
+                    "Model finished early", llm_out
+                )
+
+            self.log_call(llm_out, started)
+
+            return llm_out
+        except Exception as e:
+            self.log_call(e, started)
+
+            raise e  # re-raise
+
+    async def aget_model_output(
+        self,
+        message: str,
+        max_tokens: int,
+        stream: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
+        n: int = 1,
+    ) -> str:
+        """
+        Asynchronously get the model output for the given message.
+
+        :param message: The user's message.
+        :type message: str
+        :param max_tokens: Maximum number of tokens for the model to generate.
+        :type max_tokens: int
+        :param stream: Whether to stream the response.
+        :type stream: bool
+        :param stop_when: Predicate on the text received so far, cancels the stream.
+        :type stop_when: Optional[Callable[[str], bool]]
+        :param n: Number of responses (choices) to generate, cannot be streamed.
+        :type n: int
+        :return: The model output.
+        :rtype: str
+        """
+        started = time.time()
+
+        try:
+            if self.verbose:
+                print("+", end="", file=sys.stderr, flush=True)
+
+            client = self._get_client(asynchronous=True)
+            params = dict(
                 model=self.model,
                 messages=self.history,
                 max_tokens=max_tokens,
-                n=1,
+                n=n,
                 stop=None,
                 temperature=self.temperature,
             )
 
-            if llm_out.choices[0].finish_reason != "stop":
-                raise ValueError("Model finished early")
+            if (stream or stop_when is not None) and n > 1:
+                raise ValueError("Multiple responses cannot be streamed.")
+            elif stream or stop_when is not None:
+                llm_out = await alter_ego.utils.streaming.acollect_openai(
+                    await client.chat.completions.create(
+                        **params, stream=True, stream_options={"include_usage": True}
+                    ),
+                    stop_when,
+                    self.estimate_tokens(),
+                )
+            else:
+                llm_out = await client.chat.completions.create(**params)
+
+            if n == 1 and llm_out.choices[0].finish_reason not in FINISHED:
+                raise alter_ego.utils.retry.FinishedEarly(
+                    "Model finished early", llm_out
+                )
 
-            self.log.append(llm_out)
+            self.log_call(llm_out, started)
 
             return llm_out
         except Exception as e:
-            self.log.append(e)
+            self.log_call(e, started)
 
             raise e  # re-raise
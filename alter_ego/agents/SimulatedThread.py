@@ -0,0 +1,205 @@
+from typing import Any, Dict, Optional
+import asyncio
+import sys
+import time
+
+from alter_ego.agents import APIThread
+from alter_ego.utils.simulation import Simulator
+
+
+class SimulatedThread(APIThread):
+    """
+    Class representing a Thread backed by a simulated model, for load tests and
+    benchmarks that should not contact (or pay) a provider.
+
+    Requests go through the same throttling and retry logic as those of real API
+    Threads, but responses, latency, server errors and rate limit errors are
+    produced by an alter_ego.utils.simulation.Simulator.
+    """
+
+    PROVIDER = "simulated"
+
+    def __init__(self, **kwargs: Any):
+        """
+        Initialize the SimulatedThread.
+
+        :keyword kwargs: Additional keyword arguments, includes `latency` (seconds,
+            (low, high) tuple or function of a random.Random), `error_rate`,
+            `rate_limit_rate`, `retry_after`, `responses` (None to echo, a string, a
+            list of scripted responses or a function of the messages), `randomize`
+            and `seed`. See Simulator for details. The response cache is not used
+            unless `use_cache` is given.
+        :type kwargs: Any
+        """
+        # defaults
+        self.model = "simulated"
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.rate_limit_rate = 0.0
+        self.retry_after = 1.0
+        self.responses = None
+        self.randomize = False
+        self.seed = None
+
+        kwargs.setdefault("use_cache", False)
+
+        super().__init__(**kwargs)
+
+        self.simulator = Simulator(
+            latency=self.latency,
+            error_rate=self.error_rate,
+            rate_limit_rate=self.rate_limit_rate,
+            retry_after=self.retry_after,
+            responses=self.responses,
+            randomize=self.randomize,
+            seed=self.seed,
+        )
+
+    def send(
+        self, role: str, message: str, max_tokens: int = 500, **kwargs: Any
+    ) -> Optional[str]:
+        """
+        Submit the user message, get the simulated response, and memorize it.
+
+        :param role: Role of the sender ("user").
+        :type role: str
+        :param message: The user's message to submit.
+        :type message: str
+        :param max_tokens: Maximum number of tokens (only used for rate limiting).
+        :type max_tokens: int
+        :keyword kwargs: Additional keyword arguments.
+        :type kwargs: Any
+        :return: The simulated response.
+        :rtype: Optional[str]
+        """
+        if role == "user":
+            llm_out = self.request(
+                lambda: self.get_model_output(message, max_tokens), max_tokens
+            )
+
+            response = llm_out["choices"][0]["message"]["content"]
+
+            self.memorize("assistant", response)
+
+            return response
+
+    async def asend(
+        self, role: str, message: str, max_tokens: int = 500, **kwargs: Any
+    ) -> Optional[str]:
+        """
+        Asynchronously submit the user message, get the simulated response, and
+        memorize it.
+
+        :param role: Role of the sender ("user").
+        :type role: str
+        :param message: The user's message to submit.
+        :type message: str
+        :param max_tokens: Maximum number of tokens (only used for rate limiting).
+        :type max_tokens: int
+        :keyword kwargs: Additional keyword arguments.
+        :type kwargs: Any
+        :return: The simulated response.
+        :rtype: Optional[str]
+        """
+        if role == "user":
+            llm_out = await self.arequest(
+                lambda: self.aget_model_output(message, max_tokens), max_tokens
+            )
+
+            response = llm_out["choices"][0]["message"]["content"]
+
+            self.memorize("assistant", response)
+
+            return response
+
+    def _output(self, latency: float) -> Dict[str, Any]:
+        if (error := self.simulator.fault()) is not None:
+            raise error
+
+        messages = [dict(m) for m in self._history]
+        text = self.simulator.respond(messages)
+
+        return dict(
+            model=self.model,
+            created=int(time.time()),
+            choices=[
+                dict(
+                    index=0,
+                    message=dict(role="assistant", content=text),
+                    finish_reason="stop",
+                )
+            ],
+            usage=Simulator.usage(messages, text),
+            latency=latency,
+        )
+
+    def from_failover(self, llm_out: Any) -> Dict[str, Any]:
+        """
+        Convert a chat completion of the failover model into this Thread's format.
+
+        :param llm_out: Chat completion returned by OpenRouterThread.
+        :type llm_out: Any
+        :return: The converted output.
+        :rtype: Dict[str, Any]
+        """
+        return llm_out.model_dump()
+
+    def get_model_output(self, message: str, max_tokens: int) -> Dict[str, Any]:
+        """
+        Get the simulated output for the given message, after the simulated latency.
+
+        :param message: The user's message.
+        :type message: str
+        :param max_tokens: Maximum number of tokens for the model to generate.
+        :type max_tokens: int
+        :return: The output, shaped like an OpenAI chat completion.
+        :rtype: Dict[str, Any]
+        :raises SimulatedError: If a failure is injected.
+        """
+        started = time.time()
+
+        try:
+            if self.verbose:
+                print("+", end="", file=sys.stderr, flush=True)
+
+            time.sleep(latency := self.simulator.draw_latency())
+
+            llm_out = self._output(latency)
+
+            self.log_call(llm_out, started)
+
+            return llm_out
+        except Exception as e:
+            self.log_call(e, started)
+
+            raise e  # re-raise
+
+    async def aget_model_output(self, message: str, max_tokens: int) -> Dict[str, Any]:
+        """
+        Asynchronously get the simulated output for the given message.
+
+        :param message: The user's message.
+        :type message: str
+        :param max_tokens: Maximum number of tokens for the model to generate.
+        :type max_tokens: int
+        :return: The output, shaped like an OpenAI chat completion.
+        :rtype: Dict[str, Any]
+        :raises SimulatedError: If a failure is injected.
+        """
+        started = time.time()
+
+        try:
+            if self.verbose:
+                print("+", end="", file=sys.stderr, flush=True)
+
+            await asyncio.sleep(latency := self.simulator.draw_latency())
+
+            llm_out = self._output(latency)
+
+            self.log_call(llm_out, started)
+
+            return llm_out
+        except Exception as e:
+            self.log_call(e, started)
+
+            raise e  # re-raise
@@ -1,4 +1,6 @@
 from typing import Any, Dict, Optional
+import asyncio
+import httpx
 import json
 import os
 import requests
@@ -6,6 +8,7 @@ import sys
 import time
 
 from alter_ego.agents import APIThread
+import alter_ego.utils.clients
 
 
 class TextSynthThread(APIThread):
@@ -13,6 +16,8 @@ class TextSynthThread(APIThread):
     Class representing a TextSynth Thread.
     """
 
+    PROVIDER = "textsynth"
+
     def __init__(self, **kwargs: Any):
         """
         Initialize the TextSynthThread.
@@ -26,6 +31,14 @@ class TextSynthThread(APIThread):
 
         super().__init__(**kwargs)
 
+    def _get_client(self, asynchronous: bool = False):
+        """Get the pooled HTTP session (or asynchronous client) for this Thread's endpoint."""
+        return alter_ego.utils.clients.get_client(
+            ("textsynth", self.endpoint, self.api_key),
+            httpx.AsyncClient if asynchronous else requests.Session,
+            asynchronous,
+        )
+
     def ts_data(self) -> Dict[str, Any]:
         """
         Prepare the data for TextSynth API call.
@@ -79,9 +92,50 @@ class TextSynthThread(APIThread):
         :rtype: str
         """
         if role == "user":
-            time.sleep(self.delay)
+            llm_out = self.request(
+                lambda: self.get_model_output(message, max_tokens, extra_params),
+                max_tokens,
+                endpoint=self.endpoint,
+                extra_params=extra_params,
+            )
 
-            llm_out = self.get_model_output(message, max_tokens, extra_params)
+            response = llm_out["text"]
+
+            self.memorize("assistant", response)
+
+            return response
+
+    async def asend(
+        self,
+        role: str,
+        message: str,
+        max_tokens: int = 500,
+        extra_params: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Asynchronously submit the user message, receive the model's response, and memorize it.
+
+        :param role: Role of the sender ("user").
+        :type role: str
+        :param message: The user's message.
+        :type message: str
+        :param max_tokens: Maximum number of tokens for the model to generate.
+        :type max_tokens: int
+        :param extra_params: Additional parameters for the model.
+        :type extra_params: Optional[Dict[str, Any]]
+        :keyword kwargs: Additional keyword arguments.
+        :type kwargs: Any
+        :return: The model's response.
+        :rtype: str
+        """
+        if role == "user":
+            llm_out = await self.arequest(
+                lambda: self.aget_model_output(message, max_tokens, extra_params),
+                max_tokens,
+                endpoint=self.endpoint,
+                extra_params=extra_params,
+            )
 
             response = llm_out["text"]
 
@@ -89,6 +143,17 @@ class TextSynthThread(APIThread):
 
             return response
 
+    def from_failover(self, llm_out: Any) -> Dict[str, Any]:
+        """
+        Convert a chat completion of the failover model into this Thread's format.
+
+        :param llm_out: Chat completion returned by OpenRouterThread.
+        :type llm_out: Any
+        :return: The converted output.
+        :rtype: Dict[str, Any]
+        """
+        return dict(text=llm_out.choices[0].message.content)
+
     def get_model_output(
         self,
         message: str,
@@ -108,6 +173,8 @@ class TextSynthThread(APIThread):
         :rtype: Any
         """
 
+        started = time.time()
+
         try:
             if self.verbose:
                 print("+", end="", file=sys.stderr, flush=True)
@@ -122,17 +189,71 @@ class TextSynthThread(APIThread):
                 "temperature": self.temperature,
             } | (extra_params if extra_params is not None else {})
 
-            rq = requests.post(
+            rq = self._get_client().post(
                 self.endpoint,
                 headers=headers,
                 data=json.dumps(self.ts_data() | params),
             )
 
+            rq.raise_for_status()
+
+            llm_out = rq.json()
+            self.log_call(llm_out, started)
+
+            return llm_out
+        except Exception as e:
+            self.log_call(e, started)
+
+            raise e  # re-raise
+
+    async def aget_model_output(
+        self,
+        message: str,
+        max_tokens: int,
+        extra_params: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Asynchronously get the model output for the given message.
+
+        :param message: The user's message.
+        :type message: str
+        :param max_tokens: Maximum number of tokens for the model to generate.
+        :type max_tokens: int
+        :param extra_params: Additional parameters for the model.
+        :type extra_params: Optional[Dict[str, Any]]
+        :return: The model output.
+        :rtype: Any
+        """
+
+        started = time.time()
+
+        try:
+            if self.verbose:
+                print("+", end="", file=sys.stderr, flush=True)
+
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.api_key}",
+            }
+
+            params = {
+                "max_tokens": max_tokens,
+                "temperature": self.temperature,
+            } | (extra_params if extra_params is not None else {})
+
+            rq = await self._get_client(asynchronous=True).post(
+                self.endpoint,
+                headers=headers,
+                content=json.dumps(self.ts_data() | params),
+            )
+
+            rq.raise_for_status()
+
             llm_out = rq.json()
-            self.log.append(llm_out)
+            self.log_call(llm_out, started)
 
             return llm_out
         except Exception as e:
-            self.log.append(e)
+            self.log_call(e, started)
 
             raise e  # re-raise
@@ -1,9 +1,32 @@
+import collections
+import collections.abc
+import copy
 import json
 import random
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from alter_ego.experiment.batch import run_batch
+from alter_ego.experiment.design import (
+    Fraction,
+    Full,
+    LatinHypercube,
+    RandomSubset,
+    Sampling,
+)
+from alter_ego.experiment.sharding import Shard, get_experiment_id, get_shard
 from alter_ego.structure import Conversation
-from itertools import product
-from typing import Any, Dict, List, Optional, Type
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
 
 class Experiment:
@@ -11,19 +34,33 @@ class Experiment:
     Class for managing an Experiment, which links treatments to conversations.
     """
 
-    def __init__(self, *treatments: Type) -> None:
+    def __init__(self, *treatments: Type, seed: Any = None) -> None:
         """
         Initialize the Experiment.
 
-        :param treatments: Variable-length list of treatment classes.
+        :param treatments: Variable-length list of treatment classes, or a single
+            FactorialDesign (see factorial), whose treatments are created on demand.
         :type treatments: Type
+        :param seed: Seed of all random assignments (see rng). Defaults to the
+            Experiment's ID, which all shards of an experiment share.
+        :type seed: Any
         :raises ValueError: If less than two treatments are supplied.
         :raises AttributeError: If treatments have incongruent attributes.
         """
+        self.id = get_experiment_id() or uuid.uuid4()
+        self.shard: Optional[Shard] = get_shard()
+        self.seed = str(self.id) if seed is None else seed
+        self._rng = self.rng("link")
+
+        if len(treatments) == 1 and isinstance(treatments[0], FactorialDesign):
+            treatments = treatments[0].bind(self.rng("design"))
+
         if len(treatments) < 2:
             raise ValueError("Experiment expects at least two treatments.")
 
-        if any(hasattr(t, "__dict__") for t in treatments):
+        if not isinstance(treatments, FactorialDesign) and any(
+            hasattr(t, "__dict__") for t in treatments
+        ):  # the treatments of a FactorialDesign are congruent by construction
             keys = set(treatments[0].__dict__.keys())
 
             for treatment in treatments:
@@ -32,11 +69,70 @@ class Experiment:
                         f"Treatment {treatment.__name__} is incongruent."
                     )
 
-        self.id = uuid.uuid4()
-        self.treatments = treatments
+        self.treatments: Sequence[Any] = treatments
         self.params: Dict[str, List[str]] = {}
+        self.spent = 0.0  # running total of the cost of agents created by run
+
+    @property
+    def subdir(self) -> str:
+        """
+        :return: Directory (within "out") to save this Experiment's Threads in,
+            e.g., with `convo.all.save(e.subdir)`. Each shard has its own.
+        :rtype: str
+        """
+        if self.shard is None:
+            return str(self.id)
+
+        return f"{self.id}/{self.shard.directory}"
+
+    def replications(self, times: int) -> List[int]:
+        """
+        :param times: Number of replications of the whole experiment.
+        :type times: int
+        :return: Indices of the replications to run in this process, i.e., those
+            belonging to its shard (all if not sharded).
+        :rtype: List[int]
+        """
+        if self.shard is None:
+            return list(range(times))
+
+        return self.shard.select(range(times))
+
+    def cells(self, times: int) -> Iterator[Any]:
+        """
+        :param times: Number of replications.
+        :type times: int
+        :return: Treatment of each cell (replication and treatment) to run in this
+            process, ordered by replication. Treatments are only looked up (or, in
+            a FactorialDesign, created) when their cell is reached.
+        :rtype: Iterator[Any]
+        """
+        n = len(self.treatments)
+        start, step = (
+            (0, 1) if self.shard is None else (self.shard.index, self.shard.count)
+        )
+
+        for k in range(start, times * n, step):
+            yield self.treatments[k % n]
 
-    def link(self, convo: Conversation, treatment: Optional[Type] = None) -> None:
+    def rng(self, *stream: Any) -> random.Random:
+        """
+        Random number generator for a stream of random draws, e.g., those of a
+        replication. It depends only on the seed and the stream, so draws are
+        reproducible, no matter in which order (or shard) replications run.
+
+        :param stream: Identifies the stream, e.g., `e.rng(i, "number")`.
+        :type stream: Any
+        :rtype: random.Random
+        """
+        return random.Random("/".join(map(str, (self.seed, *stream))))
+
+    def link(
+        self,
+        convo: Conversation,
+        treatment: Optional[Type] = None,
+        replication: Optional[int] = None,
+    ) -> None:
         """
         Associate a treatment and parameters with a Conversation object.
 
@@ -44,22 +140,37 @@ class Experiment:
         :type convo: Conversation
         :param treatment: The treatment to apply; None for random selection.
         :type treatment: Optional[Type]
+        :param replication: Index of the replication. If given, random selections
+            depend only on the seed and the replication; otherwise, they depend on
+            the seed and the order of calls.
+        :type replication: Optional[int]
         """
+        rng = self._rng if replication is None else self.rng("link", replication)
+
         if treatment is None:
-            convo.all.treatment = random.choice(self.treatments)
+            convo.all.treatment = rng.choice(self.treatments)
         else:
             convo.all.treatment = treatment
 
         convo.all.experiment = self
 
         for param, values in self.params.items():
-            randomized_values = random.sample(values, len(values))
+            randomized_values = rng.sample(values, len(values))
 
             assert len(randomized_values) >= len(convo.threads)
 
             for thread, value in zip(convo.threads, randomized_values):
                 setattr(thread, param, value)
 
+    def cost(self) -> float:
+        """
+        Total cost of the agents created by run so far.
+
+        :return: The cost in USD.
+        :rtype: float
+        """
+        return self.spent
+
     def param(self, name: str, values: List[Any]) -> None:
         """
         Set a named parameter for the experiment.
@@ -79,32 +190,360 @@ class Experiment:
         *,
         outcome="result",
         keep_retval=False,
+        batch=False,
+        batch_client=None,
+        poll_interval=30.0,
+        single_request=False,
+        workers=1,
+        capture_errors=False,
+        sink=None,
         **kwargs,
     ) -> List[Dict]:
-        data = []
+        """
+        Run a one-shot experiment: each treatment's prompt is submitted to a new
+        agent, `times` times, and the filtered responses are collected.
 
+        :param agent_factory: Creates a new agent (Thread) for each cell.
+        :param filter: Applied to each response; dicts are merged into the row,
+            other values are stored under `outcome`. None keeps responses as is.
+        :param times: Number of replications.
+        :param outcome: Column name for non-dict filter results.
+        :param keep_retval: Whether to include raw responses in column "retval".
+        :param batch: Whether to obtain all responses through the OpenAI Batch API
+            (agents must be GPTThreads).
+        :param batch_client: Client for batch mode, e.g., a LocalBatchEndpoint.
+        :param poll_interval: Seconds between status checks in batch mode.
+        :param single_request: Whether to obtain all replications of a treatment
+            from a single request (see Thread.submit_n).
+        :param workers: Number of cells (replication and treatment) run
+            concurrently. Rows are in the same order either way. See also
+            APIThread.set_adaptive_concurrency.
+        :param capture_errors: Whether a cell whose request fails yields a row
+            with the exception in column "error" (None in all other rows)
+            instead of aborting the run. Errors creating agents are not
+            captured.
+        :param sink: Also writes each row to this Sink (see
+            alter_ego.experiment.sinks); see stream to process rows one by one.
+        :param kwargs: Passed to the agents' user method (or used as template
+            variables and max_tokens in batch mode).
+        :return: One row per replication and treatment (only those of this
+            process's shard, if sharded; see alter_ego.experiment.sharding).
+        """
         if filter is None:
             filter = lambda x: x
 
-        for _ in range(times):
-            for treat in self.treatments:
-                an_agent = agent_factory()
-                retval = an_agent.user(treat.prompt, **treat.data, **kwargs)
+        if batch:
+            cells = [(treat, agent_factory()) for treat in self.cells(times)]
 
-                extra = {} if not keep_retval else {"retval": retval}
+            for treat, an_agent in cells:
+                an_agent.memorize(
+                    "user", an_agent.prepare(treat.prompt, **treat.data, **kwargs)
+                )
+
+            results = run_batch(
+                [an_agent for _, an_agent in cells],
+                f"out/{self.subdir}/batch.jsonl",
+                max_tokens=kwargs.get("max_tokens", 500),
+                client=batch_client,
+                poll_interval=poll_interval,
+                with_errors=True,
+            )
+
+            self.spent += sum(an_agent.cost() for _, an_agent in cells)
+
+            data = [
+                make_row(treat, retval, filter, outcome, keep_retval)
+                | ({"error": error} if capture_errors else {})
+                for (treat, _), (retval, error) in zip(cells, results)
+            ]
+        elif single_request:
+            n = len(self.treatments)
+            cells = [
+                k for k in range(times * n) if self.shard is None or self.shard.owns(k)
+            ]
+            treats, retvals = {}, {}
+
+            for t, count in sorted(collections.Counter(k % n for k in cells).items()):
+                treats[t] = treat = self.treatments[t]
+                an_agent = agent_factory()
 
                 try:
-                    from_agent = filter(retval)
+                    results = an_agent.submit_n(
+                        treat.prompt, count, **treat.data, **kwargs
+                    )
+
+                    if len(results) != count:
+                        raise RuntimeError(
+                            f"Expected {count} responses, obtained {len(results)}."
+                        )
                 except Exception as e:
-                    from_agent = None
+                    if not capture_errors:
+                        raise
 
-                if isinstance(from_agent, dict):
-                    data.append(treat.data | from_agent | extra)
+                    results = [(None, None)] * count
+                    error = describe(e)
                 else:
-                    data.append(treat.data | {outcome: from_agent} | extra)
+                    error = "FinishedEarly: Model finished early"
+
+                retvals[t] = iter(
+                    [
+                        (retval, None if retval is not None else error)
+                        for _, retval in results
+                    ]
+                )
+                self.spent += an_agent.cost() + sum(
+                    fork.cost() for fork, _ in results if fork is not None
+                )
+
+            data = []
+
+            for k in cells:
+                retval, error = next(retvals[k % n])
+                data.append(
+                    make_row(treats[k % n], retval, filter, outcome, keep_retval)
+                    | ({"error": error} if capture_errors else {})
+                )
+        else:
+            return list(
+                self.stream(
+                    agent_factory,
+                    filter,
+                    times,
+                    outcome=outcome,
+                    keep_retval=keep_retval,
+                    workers=workers,
+                    capture_errors=capture_errors,
+                    sink=sink,
+                    **kwargs,
+                )
+            )
+
+        if sink is not None:
+            for row in data:
+                sink.write(row)
 
         return data
 
+    def stream(
+        self,
+        agent_factory,
+        filter=json.loads,
+        times=1,
+        *,
+        outcome="result",
+        keep_retval=False,
+        workers=1,
+        capture_errors=False,
+        sink=None,
+        **kwargs,
+    ) -> Iterator[Dict]:
+        """
+        Like run (without batch mode and single requests), but yields each row as
+        soon as it is available instead of collecting all rows, so that memory use
+        stays flat. Rows are yielded in the same order as run returns them.
+
+        :param agent_factory: Creates a new agent (Thread) for each cell.
+        :param filter: Applied to each response; see run.
+        :param times: Number of replications.
+        :param outcome: Column name for non-dict filter results.
+        :param keep_retval: Whether to include raw responses in column "retval".
+        :param workers: Number of cells run concurrently; see run.
+        :param capture_errors: Whether failed cells yield rows with column
+            "error" instead of aborting; see run.
+        :param sink: Also writes each row to this Sink (see
+            alter_ego.experiment.sinks), as soon as it is available.
+        :param kwargs: Passed to the agents' user method.
+        :return: Iterator over the rows.
+        """
+        if filter is None:
+            filter = lambda x: x
+
+        def finish(treat: Any, result: Tuple[Any, float, Optional[str]]) -> Dict:
+            retval, cost, error = result
+            self.spent += cost
+            row = make_row(treat, retval, filter, outcome, keep_retval)
+
+            if capture_errors:
+                row["error"] = error
+
+            if sink is not None:
+                sink.write(row)
+
+            return row
+
+        if workers <= 1:
+            for treat in self.cells(times):
+                yield finish(
+                    treat, run_cell(agent_factory, treat, kwargs, capture_errors)
+                )
+
+            return
+
+        pending: Deque[Tuple[Any, Future]] = collections.deque()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                for treat in self.cells(times):
+                    pending.append(
+                        (
+                            treat,
+                            pool.submit(
+                                run_cell, agent_factory, treat, kwargs, capture_errors
+                            ),
+                        )
+                    )
+
+                    if len(pending) >= 2 * workers:  # bound the number of results held
+                        treat, future = pending.popleft()
+                        yield finish(treat, future.result())
+
+                while pending:
+                    treat, future = pending.popleft()
+                    yield finish(treat, future.result())
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+
+def run_cell(
+    agent_factory: Callable[[], Any],
+    treat: Any,
+    kwargs: Dict[str, Any],
+    capture_errors: bool = True,
+) -> Tuple[Any, float, Optional[str]]:
+    """
+    Submit a treatment's prompt to a new agent.
+
+    :param agent_factory: Creates the agent. Its errors (e.g., a missing API key)
+        are never captured.
+    :param treat: The treatment (with attributes `prompt` and `data`).
+    :param kwargs: Passed to the agent's user method.
+    :param capture_errors: Whether to return the request's exception instead of
+        raising it.
+    :return: The response (None on failure), the agent's cost, and the
+        exception (None on success).
+    """
+    an_agent = agent_factory()
+
+    try:
+        retval = an_agent.user(treat.prompt, **treat.data, **kwargs)
+        error = None
+    except Exception as e:
+        if not capture_errors:
+            raise
+
+        retval = None
+        error = describe(e)
+
+    return retval, an_agent.cost(), error
+
+
+def describe(exc: BaseException) -> str:
+    """
+    :param exc: An exception.
+    :return: Its type and message, as stored in column "error".
+    """
+    return f"{type(exc).__name__}: {exc}"
+
+
+def make_row(
+    treat: Any,
+    retval: Any,
+    filter: Callable[[Any], Any],
+    outcome: str = "result",
+    keep_retval: bool = False,
+) -> Dict:
+    """
+    Construct a row of data from a treatment and an agent's response.
+
+    :param treat: The treatment (with attribute `data`).
+    :param retval: The agent's response.
+    :param filter: Applied to the response; exceptions yield None.
+    :param outcome: Column name for non-dict filter results.
+    :param keep_retval: Whether to include the response in column "retval".
+    :return: The row.
+    """
+    extra = {} if not keep_retval else {"retval": retval}
+
+    try:
+        from_agent = filter(retval)
+    except Exception as e:
+        from_agent = None
+
+    if isinstance(from_agent, dict):
+        return treat.data | from_agent | extra
+    else:
+        return treat.data | {outcome: from_agent} | extra
+
+
+class FactorialDesign(collections.abc.Sequence):
+    """
+    The treatments of a factorial design, created on demand from the points
+    selected by a Sampling, so that large designs are never materialized. The
+    points are selected on first access, using the rng given to bind (or the
+    Sampling's own seed).
+    """
+
+    def __init__(
+        self,
+        prompt: str,
+        factors: Dict[str, Sequence[Any]],
+        sampling: Optional[Sampling] = None,
+    ) -> None:
+        """
+        :param prompt: Prompt of all treatments.
+        :type prompt: str
+        :param factors: Levels of each factor.
+        :type factors: Dict[str, Sequence[Any]]
+        :param sampling: Selects the points to run; None for all (Full).
+        :type sampling: Optional[Sampling]
+        """
+        self.prompt = prompt
+        self.factors = {name: list(levels) for name, levels in factors.items()}
+        self.sampling = Full() if sampling is None else sampling
+        self._rng: Optional[random.Random] = None
+        self._points: Optional[Sampling] = None
+
+    def bind(self, rng: random.Random) -> "FactorialDesign":
+        """
+        :param rng: Used for random selections, unless the Sampling has a seed.
+        :type rng: random.Random
+        :return: A copy whose points are selected using rng.
+        :rtype: FactorialDesign
+        """
+        bound = copy.copy(self)
+        bound._rng = rng
+        bound._points = None
+
+        return bound
+
+    @property
+    def points(self) -> Sampling:
+        """
+        :return: The Sampling, bound to the levels of the factors.
+        :rtype: Sampling
+        """
+        if self._points is None:
+            self._points = self.sampling.bind(
+                [len(levels) for levels in self.factors.values()], self._rng
+            )
+
+        return self._points
+
+    def __getitem__(self, i: int) -> "GenericTreatment":
+        point = self.points[i]
+
+        return GenericTreatment(
+            prompt=self.prompt,
+            **{
+                name: levels[level]
+                for (name, levels), level in zip(self.factors.items(), point)
+            },
+        )
+
+    def __len__(self) -> int:
+        return len(self.points)
+
 
 class GenericTreatment:
     def __init__(self, prompt, **kwargs):
@@ -112,12 +551,15 @@ class GenericTreatment:
         self.data = kwargs
 
 
-def factorial(prompt, **kwargs) -> Experiment:
-    keys = kwargs.keys()
+def factorial(prompt, sampling: Optional[Sampling] = None, **kwargs) -> Experiment:
+    """
+    Create an Experiment with a factorial design: each keyword argument is a
+    factor, with a list of levels. Treatments are created on demand.
 
-    return Experiment(
-        *[
-            GenericTreatment(prompt=prompt, **dict(zip(keys, values)))
-            for values in product(*kwargs.values())
-        ]
-    )
+    :param prompt: Prompt of all treatments; factors are template variables.
+    :param sampling: Selects the combinations of levels to run: Full() (the
+        default), Fraction(m), LatinHypercube(n) or RandomSubset(n).
+    :param kwargs: Levels of each factor.
+    :return: The Experiment.
+    """
+    return Experiment(FactorialDesign(prompt, kwargs, sampling))
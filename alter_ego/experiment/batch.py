@@ -0,0 +1,205 @@
+import json
+import os
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def run_batch(
+    agents: List[Any],
+    target: str,
+    max_tokens: int = 500,
+    client: Optional[Any] = None,
+    poll_interval: float = 30.0,
+    verbose: bool = False,
+    with_errors: bool = False,
+) -> List[Any]:
+    """
+    Obtain the next response of many Threads through the OpenAI Batch API.
+
+    Every agent must already have memorized its (user) prompt and must support
+    batch_body and batch_result (see GPTThread). Requests are written to `target`,
+    uploaded and submitted as one batch, which is polled until it is done. Results
+    are written next to `target` (with suffix `.out.jsonl`) and memorized by the
+    respective agents.
+
+    :param agents: Threads to obtain responses for.
+    :type agents: List[Any]
+    :param target: Path of the JSONL batch file to write.
+    :type target: str
+    :param max_tokens: Maximum number of tokens for each response.
+    :type max_tokens: int
+    :param client: OpenAI client (or LocalBatchEndpoint), defaults to that of the
+        first agent.
+    :type client: Optional[Any]
+    :param poll_interval: Seconds between two status checks.
+    :type poll_interval: float
+    :param verbose: Whether to report the status of the batch on stderr.
+    :type verbose: bool
+    :param with_errors: Whether to return pairs of response and error (type and
+        message of the exception, None on success).
+    :type with_errors: bool
+    :return: Responses in the order of agents, None where a request failed.
+    :rtype: List[Any]
+    :raises RuntimeError: If the batch as a whole fails, expires or is cancelled.
+    """
+    if client is None:
+        client = agents[0]._get_client()
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+
+    with open(target, "w") as fp:
+        for i, agent in enumerate(agents):
+            line = dict(
+                custom_id=str(i),
+                method="POST",
+                url=ENDPOINT,
+                body=agent.batch_body(max_tokens),
+            )
+            fp.write(json.dumps(line) + "\n")
+
+    with open(target, "rb") as fp:
+        input_file = client.files.create(file=fp, purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=input_file.id, endpoint=ENDPOINT, completion_window="24h"
+    )
+
+    while batch.status not in FINAL_STATUSES:
+        if verbose:
+            print(f"Batch {batch.id} {batch.status}.", file=sys.stderr, flush=True)
+
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} {batch.status}.")
+
+    records: Dict[str, Dict[str, Any]] = {}
+
+    with open(os.path.splitext(target)[0] + ".out.jsonl", "w") as fp:
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                text = client.files.content(file_id).text
+                fp.write(text if text.endswith("\n") or not text else text + "\n")
+
+                for line in text.splitlines():
+                    if line.strip():
+                        record = json.loads(line)
+                        records[record["custom_id"]] = record
+
+    responses = []
+
+    for i, agent in enumerate(agents):
+        try:
+            response, error = agent.batch_result(records.get(str(i))), None
+        except Exception as e:
+            response, error = None, f"{type(e).__name__}: {e}"
+
+        responses.append((response, error) if with_errors else response)
+
+    return responses
+
+
+class LocalBatchEndpoint:
+    """
+    Offline stand-in for the parts of the OpenAI client used by run_batch.
+
+    Batches are processed synchronously when created. Each request body is passed
+    to `respond`, which returns the content of the assistant's message (or raises
+    an exception, which is reported as a failed request).
+    """
+
+    def __init__(self, respond: Optional[Callable[[Dict[str, Any]], str]] = None):
+        """
+        :param respond: Maps a request body to a response. By default, the last
+            message is echoed.
+        :type respond: Optional[Callable[[Dict[str, Any]], str]]
+        """
+        self.respond = respond or (lambda body: body["messages"][-1]["content"])
+        self.stored: Dict[str, str] = {}
+        self.batches_by_id: Dict[str, SimpleNamespace] = {}
+
+        self.files = SimpleNamespace(create=self._create_file, content=self._content)
+        self.batches = SimpleNamespace(
+            create=self._create_batch, retrieve=self.batches_by_id.__getitem__
+        )
+
+    def _store(self, text: str) -> str:
+        file_id = f"file-{uuid.uuid4().hex}"
+        self.stored[file_id] = text
+
+        return file_id
+
+    def _create_file(self, file: Any, purpose: str) -> SimpleNamespace:
+        content = file.read()
+
+        return SimpleNamespace(
+            id=self._store(content.decode() if isinstance(content, bytes) else content)
+        )
+
+    def _content(self, file_id: str) -> SimpleNamespace:
+        return SimpleNamespace(text=self.stored[file_id])
+
+    def _completion(self, custom_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        content = self.respond(body)
+
+        return dict(
+            id=f"batch_req_{custom_id}",
+            custom_id=custom_id,
+            response=dict(
+                status_code=200,
+                body=dict(
+                    id=f"chatcmpl-{uuid.uuid4().hex}",
+                    object="chat.completion",
+                    created=int(time.time()),
+                    model=body["model"],
+                    choices=[
+                        dict(
+                            index=0,
+                            message=dict(role="assistant", content=content),
+                            finish_reason="stop",
+                        )
+                    ],
+                ),
+            ),
+            error=None,
+        )
+
+    def _create_batch(
+        self, input_file_id: str, endpoint: str, completion_window: str
+    ) -> SimpleNamespace:
+        output, errors = [], []
+
+        for line in self.stored[input_file_id].splitlines():
+            request = json.loads(line)
+
+            try:
+                output.append(self._completion(request["custom_id"], request["body"]))
+            except Exception as e:
+                errors.append(
+                    dict(
+                        custom_id=request["custom_id"],
+                        response=None,
+                        error=dict(code=type(e).__name__, message=str(e)),
+                    )
+                )
+
+        batch = SimpleNamespace(
+            id=f"batch_{uuid.uuid4().hex}",
+            status="completed",
+            output_file_id=self._store("".join(json.dumps(r) + "\n" for r in output)),
+            error_file_id=(
+                self._store("".join(json.dumps(r) + "\n" for r in errors))
+                if errors
+                else None
+            ),
+        )
+        self.batches_by_id[batch.id] = batch
+
+        return batch
@@ -0,0 +1,225 @@
+import abc
+import collections.abc
+import copy
+import math
+import random
+from typing import Any, List, Optional, Sequence, Tuple
+
+Point = Tuple[int, ...]  # index of the level of each factor
+
+
+def unrank(levels: Sequence[int], i: int) -> Point:
+    """
+    :param levels: Number of levels of each factor.
+    :type levels: Sequence[int]
+    :param i: Index of a point of the full factorial design, in the order of
+        itertools.product (the last factor varies fastest).
+    :type i: int
+    :return: The point.
+    :rtype: Point
+    """
+    point = []
+
+    for n in reversed(levels):
+        i, level = divmod(i, n)
+        point.append(level)
+
+    return tuple(reversed(point))
+
+
+class Sampling(collections.abc.Sequence):
+    """
+    Selects the points of a factorial design to run, without enumerating the full
+    design. A Sampling is bound to the numbers of levels of the factors (see bind)
+    and then behaves like a sequence of points, computed on access.
+    """
+
+    def __init__(self, seed: Any = None) -> None:
+        """
+        :param seed: Seed of random selections. If None, the seed of the
+            Experiment is used.
+        :type seed: Any
+        """
+        self.seed = seed
+        self.levels: Point = ()
+
+    def bind(
+        self, levels: Sequence[int], rng: Optional[random.Random] = None
+    ) -> "Sampling":
+        """
+        :param levels: Number of levels of each factor.
+        :type levels: Sequence[int]
+        :param rng: Used for random selections, unless a seed was given.
+        :type rng: Optional[random.Random]
+        :return: A copy bound to the levels.
+        :rtype: Sampling
+        """
+        bound = copy.copy(self)
+        bound.levels = tuple(levels)
+        bound.setup(rng if self.seed is None and rng else random.Random(self.seed))
+
+        return bound
+
+    def setup(self, rng: random.Random) -> None:
+        """
+        Prepare for access, after the levels are known.
+        """
+
+    @abc.abstractmethod
+    def point(self, i: int) -> Point:
+        """
+        :param i: Index of the point, from 0 to len(self) - 1.
+        :type i: int
+        :rtype: Point
+        """
+
+    def __getitem__(self, i: int) -> Point:
+        if not isinstance(i, int):
+            raise TypeError("Designs only support integer indices.")
+
+        if i < 0:
+            i += len(self)
+
+        if not 0 <= i < len(self):
+            raise IndexError("Design index out of range.")
+
+        return self.point(i)
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        """
+        :return: Number of points.
+        :rtype: int
+        """
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} of {len(self)} points>"
+
+
+class Full(Sampling):
+    """
+    All combinations of levels, as in itertools.product.
+    """
+
+    def __len__(self) -> int:
+        return math.prod(self.levels)
+
+    def point(self, i: int) -> Point:
+        return unrank(self.levels, i)
+
+
+class Fraction(Sampling):
+    """
+    Regular fraction of the full design: the points whose level indices sum to
+    `residue` modulo `m`, i.e., about 1/m of all points. With two-level factors
+    and m = 2, this is the half fraction defined by I = AB...K.
+    """
+
+    def __init__(self, m: int = 2, residue: int = 0) -> None:
+        """
+        :param m: Keep about 1/m of the points.
+        :type m: int
+        :param residue: Which of the m fractions to keep.
+        :type residue: int
+        """
+        super().__init__()
+        self.m = m
+        self.residue = residue % m
+
+    def setup(self, rng: random.Random) -> None:
+        # completions[f][r]: combinations of factors f, ... whose sum is r mod m
+        self.completions: List[List[int]] = [[1] + [0] * (self.m - 1)]
+
+        for n in reversed(self.levels):
+            after = self.completions[0]
+            self.completions.insert(
+                0,
+                [
+                    sum(after[(r - level) % self.m] for level in range(n))
+                    for r in range(self.m)
+                ],
+            )
+
+    def __len__(self) -> int:
+        return self.completions[0][self.residue]
+
+    def point(self, i: int) -> Point:
+        point = []
+        remainder = self.residue
+
+        for f, n in enumerate(self.levels):
+            for level in range(n):
+                count = self.completions[f + 1][(remainder - level) % self.m]
+
+                if i < count:
+                    point.append(level)
+                    remainder = (remainder - level) % self.m
+                    break
+
+                i -= count
+
+        return tuple(point)
+
+
+class LatinHypercube(Sampling):
+    """
+    `n` points such that each level of each factor occurs equally often (up to
+    rounding), with levels combined at random.
+    """
+
+    def __init__(self, n: int, seed: Any = None) -> None:
+        """
+        :param n: Number of points.
+        :type n: int
+        :param seed: Seed of the random combination; see Sampling.
+        :type seed: Any
+        """
+        super().__init__(seed)
+        self.n = n
+
+    def setup(self, rng: random.Random) -> None:
+        self.strata = []
+
+        for _ in self.levels:
+            stratum = list(range(self.n))
+            rng.shuffle(stratum)
+            self.strata.append(stratum)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def point(self, i: int) -> Point:
+        return tuple(
+            stratum[i] * n // self.n for stratum, n in zip(self.strata, self.levels)
+        )
+
+
+class RandomSubset(Sampling):
+    """
+    `n` distinct points of the full design, drawn uniformly at random and run in
+    the order of the full design.
+    """
+
+    def __init__(self, n: int, seed: Any = None) -> None:
+        """
+        :param n: Number of points.
+        :type n: int
+        :param seed: Seed of the random draw; see Sampling.
+        :type seed: Any
+        """
+        super().__init__(seed)
+        self.n = n
+
+    def setup(self, rng: random.Random) -> None:
+        total = math.prod(self.levels)
+
+        if self.n > total:
+            raise ValueError(f"Cannot draw {self.n} of {total} points.")
+
+        self.indices = sorted(rng.sample(range(total), self.n))
+
+    def __len__(self) -> int:
+        return self.n
+
+    def point(self, i: int) -> Point:
+        return unrank(self.levels, self.indices[i])
@@ -0,0 +1,220 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+MANIFEST = "shard.json"
+
+
+class Shard:
+    """
+    One of `count` parts of an experiment, run by a separate process or machine.
+    Work item k (a replication, or a replication and treatment) belongs to shard
+    k % count, so that the shards partition the experiment deterministically.
+    """
+
+    def __init__(self, index: int, count: int) -> None:
+        """
+        :param index: Index of this shard, from 0 to count - 1.
+        :type index: int
+        :param count: Number of shards.
+        :type count: int
+        :raises ValueError: If index is out of range.
+        """
+        if not 0 <= index < count:
+            raise ValueError(f"Invalid shard {index}/{count}.")
+
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """
+        :param spec: Shard in the form "i/N", e.g., "0/4".
+        :type spec: str
+        :rtype: Shard
+        :raises ValueError: If spec is malformed.
+        """
+        try:
+            index, count = (int(part) for part in spec.split("/"))
+        except ValueError:
+            raise ValueError(f'Invalid shard "{spec}", expected "i/N".')
+
+        return cls(index, count)
+
+    def __repr__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    @property
+    def directory(self) -> str:
+        """
+        :return: Name of this shard's directory within the experiment's directory.
+        :rtype: str
+        """
+        return f"shard-{self.index}-of-{self.count}"
+
+    def owns(self, k: int) -> bool:
+        """
+        :param k: Index of a work item.
+        :type k: int
+        :return: Whether this shard runs the work item.
+        :rtype: bool
+        """
+        return k % self.count == self.index
+
+    def select(self, items: Sequence[T]) -> List[T]:
+        """
+        :param items: All work items, in the same order in every shard.
+        :type items: Sequence[T]
+        :return: The work items run by this shard.
+        :rtype: List[T]
+        """
+        return [item for k, item in enumerate(items) if self.owns(k)]
+
+
+_shard: Optional[Shard] = None
+_experiment_id: Optional[str] = None
+
+
+def set_shard(shard: Optional[Shard], experiment_id: Optional[str] = None) -> None:
+    """
+    Make Experiments created from now on run only a shard. All shards of an
+    experiment must be given the same experiment ID.
+
+    :param shard: The shard to run, None to run everything.
+    :type shard: Optional[Shard]
+    :param experiment_id: ID of the experiment, shared by all shards.
+    :type experiment_id: Optional[str]
+    """
+    global _shard, _experiment_id
+
+    _shard = shard
+    _experiment_id = experiment_id
+
+
+def get_shard() -> Optional[Shard]:
+    """
+    :return: The shard this process runs, if any.
+    :rtype: Optional[Shard]
+    """
+    return _shard
+
+
+def get_experiment_id() -> Optional[str]:
+    """
+    :return: The experiment ID given to set_shard, if any.
+    :rtype: Optional[str]
+    """
+    return _experiment_id
+
+
+def write_manifest(
+    experiment: str, shard: Shard, outdir: str = "out", **info: Any
+) -> None:
+    """
+    Record the state of a shard in its directory.
+
+    :param experiment: Experiment ID.
+    :type experiment: str
+    :param shard: The shard.
+    :type shard: Shard
+    :param outdir: The main output directory.
+    :type outdir: str
+    :param info: Stored in the manifest, e.g., finished=True.
+    :type info: Any
+    """
+    target = Path(outdir, experiment, shard.directory)
+    target.mkdir(parents=True, exist_ok=True)
+
+    manifest: Dict[str, Any] = dict(index=shard.index, count=shard.count)
+
+    if (target / MANIFEST).exists():
+        with open(target / MANIFEST) as fp:
+            manifest |= json.load(fp)
+
+    manifest |= info
+    manifest["updated"] = time.time()
+
+    with open(target / MANIFEST, "w") as fp:
+        json.dump(manifest, fp)
+
+
+def merge(experiment: str, outdir: str = "out", force: bool = False) -> int:
+    """
+    Merge the shards of an experiment into a single experiment directory, as if
+    it had been run by one process. The shard directories are removed.
+
+    :param experiment: Experiment ID.
+    :type experiment: str
+    :param outdir: The main output directory.
+    :type outdir: str
+    :param force: Whether to merge even if shards are missing or unfinished.
+    :type force: bool
+    :return: Number of merged shards.
+    :rtype: int
+    :raises ValueError: If shards are missing or unfinished (unless forced), if
+        a shard's manifest is missing, or if shards contain the same file.
+    """
+    path = Path(outdir, experiment)
+    shard_dirs = sorted(d for d in path.glob("shard-*-of-*") if d.is_dir())
+
+    if not shard_dirs:
+        raise ValueError(f"No shards found in {path}.")
+
+    manifests = []
+
+    for shard_dir in shard_dirs:
+        try:
+            with open(shard_dir / MANIFEST) as fp:
+                manifests.append(json.load(fp))
+        except FileNotFoundError:
+            raise ValueError(f"Manifest {MANIFEST} missing in {shard_dir}.")
+
+    counts = {m["count"] for m in manifests}
+    missing = (
+        set(range(max(counts))) - {m["index"] for m in manifests}
+        if len(counts) == 1
+        else None
+    )
+    unfinished = [
+        repr(Shard(m["index"], m["count"])) for m in manifests if not m.get("finished")
+    ]
+
+    if not force:
+        if missing is None:
+            raise ValueError(f"Shards of different splits: {sorted(counts)}.")
+        elif missing:
+            raise ValueError(f"Missing shards: {sorted(missing)}.")
+        elif unfinished:
+            raise ValueError(f"Unfinished shards: {', '.join(unfinished)}.")
+
+    seen = set()
+
+    for shard_dir in shard_dirs:
+        for source in shard_dir.rglob("*"):
+            if source.is_file() and source.name != MANIFEST:
+                relative = source.relative_to(shard_dir)
+
+                if relative in seen or (path / relative).exists():
+                    raise ValueError(f"{relative} exists in more than one shard.")
+
+                seen.add(relative)
+
+    for shard_dir in shard_dirs:
+        for source in sorted(shard_dir.rglob("*")):
+            if source.is_file() and source.name != MANIFEST:
+                target = path / source.relative_to(shard_dir)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source, target)
+
+    with open(path / "merged.json", "w") as fp:
+        json.dump(dict(shards=manifests, merged=time.time()), fp)
+
+    for shard_dir in shard_dirs:
+        shutil.rmtree(shard_dir)
+
+    return len(shard_dirs)
@@ -0,0 +1,179 @@
+import abc
+import csv
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+
+class Sink(abc.ABC):
+    """
+    Receives the rows of an experiment as they are produced (see
+    Experiment.stream) and persists each one immediately, so that partial results
+    survive if the process dies. Sinks append to existing files.
+    """
+
+    @abc.abstractmethod
+    def write(self, row: Dict[str, Any]) -> None:
+        """
+        Persist a row.
+
+        :param row: The row.
+        :type row: Dict[str, Any]
+        """
+
+    def close(self) -> None:
+        """
+        Close the underlying file.
+        """
+
+    def __enter__(self) -> "Sink":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class JSONLSink(Sink):
+    """
+    Writes one JSON object per row.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: File to append to.
+        :type path: str
+        """
+        self.fp = open(path, "a")
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self.fp.write(json.dumps(row, default=str) + "\n")
+        self.fp.flush()
+
+    def close(self) -> None:
+        self.fp.close()
+
+
+class CSVSink(Sink):
+    """
+    Writes rows as CSV. The columns are taken from `fieldnames`, from the header
+    of an existing file, or from the first row. Rows may lack columns, but a row
+    with a column that is not in the header is rejected; pass `fieldnames` if
+    rows differ, or use a JSONLSink or SQLiteSink.
+    """
+
+    def __init__(self, path: str, fieldnames: Optional[List[str]] = None) -> None:
+        """
+        :param path: File to append to.
+        :type path: str
+        :param fieldnames: Columns, in order. Ignored if the file has a header.
+        :type fieldnames: Optional[List[str]]
+        """
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, newline="") as fp:
+                fieldnames = next(csv.reader(fp))
+
+        self.fp = open(path, "a", newline="")
+        self.writer: Optional[csv.DictWriter] = None
+        self.fieldnames = fieldnames
+
+        if fieldnames is not None:
+            self._start(os.path.getsize(path) == 0)
+
+    def _start(self, header: bool) -> None:
+        self.writer = csv.DictWriter(self.fp, fieldnames=self.fieldnames)
+
+        if header:
+            self.writer.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """
+        Persist a row.
+
+        :param row: The row.
+        :type row: Dict[str, Any]
+        :raises ValueError: If the row has columns that are not in the header.
+        """
+        if self.writer is None:
+            self.fieldnames = list(row)
+            self._start(True)
+
+        if extra := [column for column in row if column not in self.fieldnames]:
+            raise ValueError(
+                f"Columns not in the header of {self.fp.name}: {', '.join(extra)}."
+            )
+
+        self.writer.writerow(row)
+        self.fp.flush()
+
+    def close(self) -> None:
+        self.fp.close()
+
+
+class SQLiteSink(Sink):
+    """
+    Inserts rows into an SQLite table, adding columns as they appear. Values other
+    than numbers, strings and None are stored as JSON.
+    """
+
+    def __init__(self, path: str, table: str = "results") -> None:
+        """
+        :param path: Database file.
+        :type path: str
+        :param table: Table to insert into, created if necessary.
+        :type table: str
+        """
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.table = table
+        self.db.execute(
+            f'CREATE TABLE IF NOT EXISTS "{table}" (_row INTEGER PRIMARY KEY)'
+        )
+        self.columns = {
+            column[1] for column in self.db.execute(f'PRAGMA table_info("{table}")')
+        }
+
+    @staticmethod
+    def _value(value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+
+        return json.dumps(value, default=str)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        for column in row:
+            if column not in self.columns:
+                self.db.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{column}"')
+                self.columns.add(column)
+
+        columns = ", ".join(f'"{column}"' for column in row)
+        placeholders = ", ".join("?" for _ in row)
+
+        self.db.execute(
+            f'INSERT INTO "{self.table}" ({columns}) VALUES ({placeholders})',
+            [self._value(value) for value in row.values()],
+        )
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def open_sink(path: str) -> Sink:
+    """
+    Open a sink for a file, by extension: .csv, .jsonl or .sqlite/.db.
+
+    :param path: The file.
+    :type path: str
+    :rtype: Sink
+    :raises ValueError: If the extension is unknown.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".csv":
+        return CSVSink(path)
+    elif extension in (".jsonl", ".ndjson"):
+        return JSONLSink(path)
+    elif extension in (".sqlite", ".sqlite3", ".db"):
+        return SQLiteSink(path)
+
+    raise ValueError(f"No sink for {path}, expected .csv, .jsonl or .sqlite.")
@@ -13,6 +13,7 @@ SESSION_KEY_FORMAT = "__alter_ego/session"
 OUTPATH = ".ego_output/"
 NO_SAVE = False
 FULL_SAVE = True
+JOURNAL = False  # append to a journal instead of rewriting files on every message
 
 
 def html_history(thread: Thread) -> None:
@@ -28,6 +29,11 @@ def save(thread: Thread) -> None:
     if not NO_SAVE:
         outdir = OUTPATH + thread.metadata["otree_session"]
 
+        if JOURNAL:
+            thread.journal(outdir=outdir)
+
+            return
+
         # save json backup
         thread.save(outdir=outdir, full_save=False)
 
@@ -36,6 +42,14 @@ def save(thread: Thread) -> None:
             thread.save(outdir=outdir, full_save=True)
 
 
+def compact(thread: Thread) -> None:
+    """Write the regular save files of a journaled thread."""
+    if not NO_SAVE:
+        outdir = OUTPATH + thread.metadata["otree_session"]
+
+        thread.compact(outdir=outdir, full_save=FULL_SAVE)
+
+
 def add_hooks(thread: Thread) -> None:
     """Add history hooks to a thread."""
     thread.history_hooks.add(html_history)
@@ -93,6 +107,12 @@ class Assigner:
 
     def unset(self) -> None:
         """Unset the key in all assignees."""
+        if self and JOURNAL:
+            value = self.assignees[0].vars[self.key]
+
+            for thread in value if isinstance(value, Conversation) else [value]:
+                compact(thread)
+
         for assignee in self.assignees:
             if self.key in assignee.vars:
                 del assignee.vars[self.key]
@@ -1,4 +1,6 @@
-from typing import Callable, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Any, Optional
+import asyncio
 
 
 class Relay:
@@ -8,8 +10,11 @@ class Relay:
 
     :ivar _source: The source object.
     :ivar _targets: A list of target objects.
+    :cvar MAX_WORKERS: Default upper bound on worker threads for concurrent calls.
     """
 
+    MAX_WORKERS = 16
+
     def __init__(self, source: Any, targets: List[Any]) -> None:
         """
         Initialize a new Relay instance.
@@ -52,6 +57,107 @@ class Relay:
         for target in self._targets:
             getattr(target, methodname)(*args, **kwargs)
 
+    def call_concurrently(
+        self,
+        methodname: str,
+        *args: Any,
+        max_workers: Optional[int] = None,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> List[Any]:
+        """
+        Invoke a method on all target objects in parallel, using a bounded pool of
+        worker threads. Useful when the calls are independent, e.g., when all Threads
+        of a Conversation move simultaneously.
+
+        :param methodname: The method's name to be called on target objects.
+        :type methodname: str
+        :param args: Positional arguments for the method.
+        :type args: Any
+        :param max_workers: Maximum number of worker threads, defaults to MAX_WORKERS.
+        :type max_workers: Optional[int]
+        :param return_exceptions: If True, exceptions are returned in place of results.
+            Otherwise, the first exception (in target order) is raised once all calls
+            have finished.
+        :type return_exceptions: bool
+        :param kwargs: Keyword arguments for the method.
+        :type kwargs: Any
+        :return: Return values in target order.
+        :rtype: List[Any]
+        """
+        workers = min(max_workers or self.MAX_WORKERS, len(self._targets)) or 1
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(getattr(target, methodname), *args, **kwargs)
+                for target in self._targets
+            ]
+
+        results = []
+
+        for future in futures:
+            exc = future.exception()
+
+            if exc is not None and not return_exceptions:
+                raise exc
+
+            results.append(exc if exc is not None else future.result())
+
+        return results
+
+    async def acall_all(
+        self,
+        methodname: str,
+        *args: Any,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> List[Any]:
+        """
+        Invoke a coroutine method (such as 'asubmit') on all target objects
+        concurrently.
+
+        :param methodname: The coroutine method's name to be called on target objects.
+        :type methodname: str
+        :param args: Positional arguments for the method.
+        :type args: Any
+        :param return_exceptions: If True, exceptions are returned in place of results.
+        :type return_exceptions: bool
+        :param kwargs: Keyword arguments for the method.
+        :type kwargs: Any
+        :return: Return values in target order.
+        :rtype: List[Any]
+        """
+        return await asyncio.gather(
+            *(getattr(target, methodname)(*args, **kwargs) for target in self._targets),
+            return_exceptions=return_exceptions,
+        )
+
+    def submit(self, *args: Any, **kwargs: Any) -> List[Any]:
+        """
+        Shortcut to call 'submit' method on all target objects in parallel.
+
+        :param args: Positional arguments for 'submit' method.
+        :type args: Any
+        :param kwargs: Keyword arguments for 'submit' method and call_concurrently.
+        :type kwargs: Any
+        :return: Responses in target order.
+        :rtype: List[Any]
+        """
+        return self.call_concurrently("submit", *args, **kwargs)
+
+    async def asubmit(self, *args: Any, **kwargs: Any) -> List[Any]:
+        """
+        Shortcut to await 'asubmit' on all target objects concurrently.
+
+        :param args: Positional arguments for 'asubmit' method.
+        :type args: Any
+        :param kwargs: Keyword arguments for 'asubmit' method and acall_all.
+        :type kwargs: Any
+        :return: Responses in target order.
+        :rtype: List[Any]
+        """
+        return await self.acall_all("asubmit", *args, **kwargs)
+
     def save(self, *args: Any, **kwargs: Any) -> None:
         """
         Shortcut to call 'save' method on all target objects.
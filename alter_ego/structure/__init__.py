@@ -1,14 +1,69 @@
 from abc import ABC, abstractmethod
 from typing import Callable, Dict, Iterator, List, Set, Tuple, Union, Any
-from jinja2 import Environment, StrictUndefined
+from jinja2 import Environment, StrictUndefined, Template
 from alter_ego.structure.Relay import Relay
+import asyncio
 import copy
+import functools
 import uuid
 import os
 import pickle
 import json
+import time
 
 VALID_ROLES = ["system", "user", "assistant"]
+TEMPLATE_CACHE_SIZE = 512
+
+TEMPLATE_ENV = Environment(undefined=StrictUndefined)
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(source: str) -> Template:
+    """
+    Compile a template using the shared environment. Compiled templates are
+    kept in a process-wide LRU cache keyed by their source text.
+
+    :param source: Template string.
+    :return: Compiled template.
+    """
+    return TEMPLATE_ENV.from_string(source)
+
+
+def template_cache_info() -> Dict[str, int]:
+    """
+    :return: Hit and miss counters as well as current and maximum size of the
+        shared template cache.
+    """
+    info = compile_template.cache_info()
+
+    return dict(
+        hits=info.hits, misses=info.misses, size=info.currsize, maxsize=info.maxsize
+    )
+
+
+class Message(dict):
+    """
+    Immutable message in a Thread's history.
+
+    Messages are never modified after being memorized, so they can be shared
+    between snapshots of the history (and between Threads) without copying.
+    Since this is a dict, messages can be passed to APIs and serialized as is.
+    """
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("Messages in a Thread's history cannot be modified.")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self) -> Tuple[type, Tuple[Dict[str, str]]]:
+        return (self.__class__, (dict(self),))
+
+    def __copy__(self) -> "Message":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "Message":
+        return self
 
 
 class Thread(ABC):
@@ -16,6 +71,8 @@ class Thread(ABC):
     Abstract base class representing a Thread.
     """
 
+    env: Environment = TEMPLATE_ENV  # set on an instance to use a custom environment
+
     def __init__(self, **params: Any) -> None:
         """
         Initialize a Thread instance.
@@ -26,12 +83,13 @@ class Thread(ABC):
         self.__dict__ |= params
         self.id: uuid.UUID = uuid.uuid4()
         self.metadata: Dict[str, Any] = {}
-        self._history: List[Dict[str, str]] = []
+        self._history: List[Message] = []
+        self._system_set: bool = False
         self.tainted: bool = False
         self.convo = None  # Will be assigned later
         self.history_hooks: Set[Callable] = set()
         self.choices: List[Any] = []
-        self.env: Environment = Environment(undefined=StrictUndefined)
+        self._journal_state: Dict[str, Any] = dict(messages=0, choices=0, metadata={})
 
     def __repr__(self) -> str:
         """
@@ -39,12 +97,29 @@ class Thread(ABC):
         """
         return f"<{self.__class__.__name__}/{self.name if 'name' in self.__dict__ else str(self.id)[0:8]}>"
 
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """
+        Restore a pickled Thread, including those saved by older versions.
+
+        :param state: State as returned by __getstate__.
+        """
+        self.__dict__ |= state
+        self.__dict__.setdefault(
+            "_journal_state", dict(messages=0, choices=0, metadata={})
+        )
+        self._history = [
+            item if isinstance(item, Message) else Message(item)
+            for item in self._history
+        ]
+        self._system_set = any(item["role"] == "system" for item in self._history)
+
     @property
-    def history(self) -> List[Dict[str, str]]:
+    def history(self) -> List[Message]:
         """
-        :return: Deep copy of message history.
+        :return: Copy of message history. The messages themselves are immutable
+            and shared rather than copied, so this is cheap.
         """
-        return copy.deepcopy(self._history)
+        return list(self._history)
 
     def memorize(self, role: str, message: str) -> None:
         """
@@ -57,10 +132,14 @@ class Thread(ABC):
         if role not in VALID_ROLES:
             raise ValueError(f'Invalid role "{role}".')
 
-        if role == "system" and any(item["role"] == "system" for item in self.history):
+        if role == "system" and self._system_set:
             raise ValueError(f"System message already set.")
 
-        self._history.append({"role": role, "content": message})
+        self._history.append(Message(role=role, content=message))
+
+        if role == "system":
+            self._system_set = True
+
         for f in self.history_hooks:
             f(self)
 
@@ -72,19 +151,20 @@ class Thread(ABC):
         :param extra: Additional parameters to inject into the template.
         :return: Rendered template string.
         """
-        template = self.env.from_string(template)
-        return template.render(**extra, **self.__dict__)
+        if self.env is TEMPLATE_ENV:
+            compiled = compile_template(template)
+        else:
+            compiled = self.env.from_string(template)
 
-    def save(
-        self, subdir: str = ".", outdir: str = "out", full_save: bool = True
-    ) -> None:
+        return compiled.render(**extra, **self.__dict__)
+
+    def target_dir(self, subdir: str = ".", outdir: str = "out") -> str:
         """
-        Saves the current Thread into a file.
+        Determines (and creates) the directory this Thread is saved in.
 
         :param subdir: The sub-directory to save the file in.
         :param outdir: The main directory to save the file in.
-        :param full_save: Whether to save as pickle (True) or JSON (False).
-        :raises ValueError: If the Thread is not part of a Conversation.
+        :return: The target directory.
         """
         if self.convo is None:
             target_dir = f"{outdir}/{subdir}"
@@ -93,6 +173,23 @@ class Thread(ABC):
 
         os.makedirs(target_dir, exist_ok=True)
 
+        return target_dir
+
+    def save(
+        self, subdir: str = ".", outdir: str = "out", full_save: bool = True
+    ) -> None:
+        """
+        Saves the current Thread into a file. Along with the pickle, a summary of
+        its usage (see usage) is written, so that costs can be totalled without
+        unpickling.
+
+        :param subdir: The sub-directory to save the file in.
+        :param outdir: The main directory to save the file in.
+        :param full_save: Whether to save as pickle (True) or JSON (False).
+        :raises ValueError: If the Thread is not part of a Conversation.
+        """
+        target_dir = self.target_dir(subdir, outdir)
+
         outfile = (
             f"{target_dir}/{self.id}.pkl"
             if full_save
@@ -104,7 +201,61 @@ class Thread(ABC):
             if full_save:
                 pickle.dump(self, fp)
             else:
-                json.dump(dict(history=self.history, metadata=self.metadata), fp)
+                json.dump(dict(history=self._history, metadata=self.metadata), fp)
+
+        if full_save:
+            with open(f"{target_dir}/{self.id}.usage.json", "w") as fp:
+                json.dump(self.usage(), fp)
+
+    def journal(self, subdir: str = ".", outdir: str = "out") -> None:
+        """
+        Appends everything that changed since the last call to this Thread's
+        journal (a JSONL file next to the regular save files). Each memorized
+        message, each new choice and each change of metadata becomes one
+        record, so the cost of a call does not grow with the history.
+
+        :param subdir: The sub-directory to save the file in.
+        :param outdir: The main directory to save the file in.
+        """
+        state = self._journal_state
+        now = time.time()
+        records = []
+
+        for message in self._history[state["messages"] :]:
+            records.append(dict(t=now, type="message") | message)
+
+        for choice in self.choices[state["choices"] :]:
+            records.append(dict(t=now, type="choice", choice=choice))
+
+        if self.metadata != state["metadata"]:
+            records.append(dict(t=now, type="metadata", metadata=self.metadata))
+
+        if records:
+            outfile = f"{self.target_dir(subdir, outdir)}/{self.id}.jsonl"
+
+            with open(outfile, "a") as fp:
+                fp.write("".join(json.dumps(record) + "\n" for record in records))
+
+            state["messages"] = len(self._history)
+            state["choices"] = len(self.choices)
+            state["metadata"] = copy.deepcopy(self.metadata)
+
+    def compact(
+        self, subdir: str = ".", outdir: str = "out", full_save: bool = True
+    ) -> None:
+        """
+        Flushes the journal and writes the current state of the Thread in the
+        regular (pickle and JSON) formats.
+
+        :param subdir: The sub-directory to save the files in.
+        :param outdir: The main directory to save the files in.
+        :param full_save: Whether to also write the pickle.
+        """
+        self.journal(subdir, outdir)
+        self.save(subdir, outdir, full_save=False)
+
+        if full_save:
+            self.save(subdir, outdir, full_save=True)
 
     def cost(self) -> float:
         """
@@ -112,7 +263,15 @@ class Thread(ABC):
 
         :returns: The cost, 0.0 for this base implementation. Adjust in subclasses.
         """
-        raise NotImplementedError
+        return 0.0
+
+    def usage(self) -> Dict[str, Any]:
+        """
+        Summarizes the resources used by the Thread.
+
+        :returns: At least the cost. Subclasses may add, e.g., token counts.
+        """
+        return dict(cost=self.cost())
 
     def system(self, message: str, **kwargs: Any) -> Any:
         """
@@ -170,6 +329,47 @@ class Thread(ABC):
 
         return retval
 
+    def fork(self) -> "Thread":
+        """
+        Creates an independent copy of this Thread with a new id. Messages are
+        immutable and hence shared with the original rather than copied.
+
+        :returns: The fork.
+        """
+        new = copy.copy(self)
+        new.id = uuid.uuid4()
+        new.metadata = copy.deepcopy(self.metadata)
+        new._history = list(self._history)
+        new.history_hooks = set(self.history_hooks)
+        new.choices = list(self.choices)
+        new._journal_state = dict(messages=0, choices=0, metadata={})
+
+        return new
+
+    def submit_n(
+        self, message: str, n: int, **kwargs: Any
+    ) -> List[Tuple["Thread", Any]]:
+        """
+        Submits a message once and obtains n responses, each of which is memorized in
+        its own fork of this Thread. This Thread itself only memorizes the message.
+        Subclasses may obtain all responses from a single request; by default, the
+        message is sent once per fork.
+
+        :param message: The message to submit.
+        :param n: Number of responses.
+        :param kwargs: Additional keyword arguments for message preparation.
+        :returns: Pairs of fork and response.
+        """
+        self.memorize("user", m := self.prepare(message, **kwargs))
+
+        results = []
+
+        for _ in range(n):
+            fork = self.fork()
+            results.append((fork, fork.send("user", m, **kwargs)))
+
+        return results
+
     @abstractmethod
     def send(self, role: str, message: str, **kwargs: Any) -> Any:
         """
@@ -182,6 +382,121 @@ class Thread(ABC):
         """
         pass
 
+    async def asystem(self, message: str, **kwargs: Any) -> Any:
+        """
+        Sends a system-level message asynchronously.
+
+        :param message: The message to send.
+        :param kwargs: Additional keyword arguments for message preparation.
+        :returns: Return value from the asend method.
+        """
+        self.memorize("system", m := self.prepare(message, **kwargs))
+
+        retval = await self.asend("system", m, **kwargs)
+
+        return retval
+
+    async def auser(self, message: str, **kwargs: Any) -> Any:
+        """
+        Sends a user-level message asynchronously.
+
+        :param message: The message to send.
+        :param kwargs: Additional keyword arguments for message preparation.
+        :returns: Return value from the asend method.
+        """
+        self.memorize("user", m := self.prepare(message, **kwargs))
+
+        retval = await self.asend("user", m, **kwargs)
+
+        return retval
+
+    async def aassistant(self, message: str, **kwargs: Any) -> Any:
+        """
+        Sends an assistant-level message asynchronously.
+
+        :param message: The message to send.
+        :param kwargs: Additional keyword arguments for message preparation.
+        :returns: Return value from the asend method.
+        """
+        self.memorize("assistant", m := self.prepare(message, **kwargs))
+
+        retval = await self.asend("assistant", m, **kwargs)
+
+        return retval
+
+    async def asubmit(self, message: str, **kwargs: Any) -> Any:
+        """
+        Submits a message as a user and sends it asynchronously after preparation.
+
+        :param message: The message to submit.
+        :param kwargs: Additional keyword arguments for message preparation.
+        :returns: Return value from the asend method.
+        """
+        self.memorize("user", m := self.prepare(message, **kwargs))
+
+        retval = await self.asend("user", m, **kwargs)
+
+        return retval
+
+    async def asend(self, role: str, message: str, **kwargs: Any) -> Any:
+        """
+        Asynchronous counterpart of send. Subclasses talking to an API should
+        override this with a native implementation; by default, send is run
+        in a worker thread so that the event loop is not blocked.
+
+        :param role: Role of the sender, can be 'system', 'user', or 'assistant'.
+        :param message: The message to be sent.
+        :param kwargs: Additional keyword arguments.
+        :returns: Implementation dependent.
+        """
+        return await asyncio.to_thread(self.send, role, message, **kwargs)
+
+
+def read_journal(path: str) -> Dict[str, Any]:
+    """
+    Replays a journal written by Thread.journal.
+
+    :param path: Path to the JSONL journal.
+    :return: Dictionary with the history, metadata and choices of the Thread,
+        i.e., the JSON save format plus choices.
+    """
+    data: Dict[str, Any] = dict(history=[], metadata={}, choices=[])
+
+    with open(path) as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+
+            record = json.loads(line)
+            kind = record.pop("type")
+            record.pop("t", None)
+
+            if kind == "message":
+                data["history"].append(record)
+            elif kind == "choice":
+                data["choices"].append(record["choice"])
+            elif kind == "metadata":
+                data["metadata"] = record["metadata"]
+
+    return data
+
+
+def compact_journal(path: str) -> str:
+    """
+    Writes the JSON save file corresponding to a journal, without requiring the
+    Thread itself.
+
+    :param path: Path to the JSONL journal.
+    :return: Path to the JSON file that was written.
+    """
+    data = read_journal(path)
+    outfile = os.path.splitext(path)[0] + ".json"
+
+    with open(outfile, "w") as fp:
+        json.dump(dict(history=data["history"], metadata=data["metadata"]), fp)
+
+    return outfile
+
 
 class Conversation:
     """
@@ -223,6 +538,14 @@ class Conversation:
             elif len(self.threads) > 2:
                 thread.others = [t for t in self.threads if t != thread]
 
+    def cost(self) -> float:
+        """
+        Computes the total cost of all Threads in this Conversation.
+
+        :returns: The cost.
+        """
+        return sum(thread.cost() for thread in self.threads)
+
     def __iter__(self) -> Iterator[Thread]:
         """
         Create an iterator for traversing through the Threads in this Conversation.
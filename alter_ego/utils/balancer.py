@@ -0,0 +1,248 @@
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import alter_ego.utils.retry
+
+
+class Endpoint:
+    """
+    State and statistics of one endpoint.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency: Optional[float] = None  # exponentially weighted moving average
+        self.healthy = True
+        self.retry_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            in_flight=self.in_flight,
+            requests=self.requests,
+            failures=self.failures,
+            latency=self.latency,
+            healthy=self.healthy,
+        )
+
+
+class LoadBalancer:
+    """
+    Routes requests to the least-loaded healthy endpoint of a pool.
+
+    Endpoints are ranked by requests in flight, then by average latency. An
+    endpoint is taken out of rotation after `max_failures` consecutive failures
+    (or a failed health check) and is tried again after `cooldown` seconds.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        health_check: Optional[Callable[[str], bool]] = None,
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+        smoothing: float = 0.2,
+    ) -> None:
+        """
+        :param urls: Base URLs of the endpoints.
+        :type urls: List[str]
+        :param health_check: Returns whether the endpoint with the given URL is healthy.
+        :type health_check: Optional[Callable[[str], bool]]
+        :param max_failures: Consecutive failures after which an endpoint is unhealthy.
+        :type max_failures: int
+        :param cooldown: Seconds until an unhealthy endpoint is tried again.
+        :type cooldown: float
+        :param smoothing: Weight of the latest latency in the moving average.
+        :type smoothing: float
+        """
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.health_check = health_check
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+
+    def _readmit(self) -> None:
+        """
+        Probe unhealthy endpoints whose cooldown has passed with the health check,
+        in a background thread so as not to delay requests, and readmit those
+        that pass. Without a health check, they are readmitted on trial (see
+        choose).
+        """
+        if self.health_check is None:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            due = [e for e in self.endpoints if not e.healthy and e.retry_at <= now]
+
+            for endpoint in due:  # so that concurrent callers do not probe, too
+                endpoint.retry_at = now + self.cooldown
+
+        def probe() -> None:
+            for endpoint in due:
+                self._check(endpoint)
+
+        if due:
+            threading.Thread(target=probe, daemon=True).start()
+
+    def _check(self, endpoint: Endpoint) -> bool:
+        try:
+            healthy = self.health_check is None or self.health_check(endpoint.url)
+        except Exception:
+            healthy = False
+
+        with self._lock:
+            if healthy:
+                endpoint.healthy = True
+                endpoint.consecutive_failures = 0
+            else:
+                self._mark_unhealthy(endpoint)
+
+        return healthy
+
+    def choose(self) -> Endpoint:
+        """
+        Select an endpoint and count the request as in flight. Unhealthy endpoints
+        whose cooldown has passed are probed in the background if there is a
+        health check (and used once they pass), and otherwise tried again with
+        this request.
+
+        :return: The least-loaded healthy endpoint. If no endpoint is healthy, the one
+            that has been out of rotation the longest.
+        :rtype: Endpoint
+        """
+        self._readmit()
+
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                e
+                for e in self.endpoints
+                if e.healthy or (self.health_check is None and e.retry_at <= now)
+            ] or sorted(self.endpoints, key=lambda e: e.retry_at)[:1]
+
+            endpoint = min(candidates, key=lambda e: (e.in_flight, e.latency or 0.0))
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: float, ok: bool) -> None:
+        """
+        Record the outcome of a request.
+
+        :param endpoint: Endpoint as returned by choose.
+        :type endpoint: Endpoint
+        :param latency: Duration of the request in seconds.
+        :type latency: float
+        :param ok: Whether the request succeeded.
+        :type ok: bool
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+
+            if ok:
+                endpoint.consecutive_failures = 0
+                endpoint.healthy = True
+                endpoint.latency = (
+                    latency
+                    if endpoint.latency is None
+                    else self.smoothing * latency
+                    + (1 - self.smoothing) * endpoint.latency
+                )
+            else:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+
+                if endpoint.consecutive_failures >= self.max_failures:
+                    self._mark_unhealthy(endpoint)
+
+    def _mark_unhealthy(self, endpoint: Endpoint) -> None:
+        endpoint.healthy = False
+        endpoint.retry_at = time.monotonic() + self.cooldown
+
+    @contextlib.contextmanager
+    def use(self) -> Iterator[str]:
+        """
+        Context manager choosing an endpoint and recording the request's outcome.
+        Only transient errors (see alter_ego.utils.retry) count as failures.
+
+        :return: URL of the chosen endpoint.
+        :rtype: Iterator[str]
+        """
+        endpoint = self.choose()
+        start = time.monotonic()
+        ok = False
+
+        try:
+            yield endpoint.url
+            ok = True
+        except Exception as e:
+            ok = not alter_ego.utils.retry.is_transient(e)
+
+            raise
+        finally:
+            self.release(endpoint, time.monotonic() - start, ok)
+
+    def check_health(self) -> Dict[str, bool]:
+        """
+        Actively check all endpoints using the health check, updating their status.
+
+        :return: Health of each endpoint by URL.
+        :rtype: Dict[str, bool]
+        """
+        return {endpoint.url: self._check(endpoint) for endpoint in self.endpoints}
+
+    def check_periodically(self, interval: float = 30.0) -> threading.Event:
+        """
+        Run check_health at regular intervals, in a background thread.
+
+        :param interval: Seconds between two checks.
+        :type interval: float
+        :return: An event; set it to stop checking.
+        :rtype: threading.Event
+        """
+        stop = threading.Event()
+
+        def check() -> None:
+            while not stop.wait(interval):
+                self.check_health()
+
+        threading.Thread(target=check, daemon=True).start()
+
+        return stop
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: In-flight requests, request and failure counts, average latency
+            and health of each endpoint by URL.
+        :rtype: Dict[str, Dict[str, Any]]
+        """
+        with self._lock:
+            return {e.url: e.stats() for e in self.endpoints}
+
+
+_balancers: Dict[Tuple[str, ...], LoadBalancer] = {}
+_lock = threading.Lock()
+
+
+def get_balancer(
+    urls: List[str], health_check: Optional[Callable[[str], bool]] = None
+) -> LoadBalancer:
+    """
+    :return: The process-wide load balancer for the given pool of endpoints.
+    :rtype: LoadBalancer
+    """
+    with _lock:
+        key = tuple(urls)
+
+        if key not in _balancers:
+            _balancers[key] = LoadBalancer(list(urls), health_check)
+
+        return _balancers[key]
@@ -0,0 +1,141 @@
+import collections
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpen(RuntimeError):
+    """
+    Raised instead of contacting a provider whose circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a failing provider.
+
+    The breaker opens once `threshold` failures occurred within `window` seconds.
+    While open, requests fail immediately. After `cooldown` seconds, a single
+    probe request is let through (half-open): if it succeeds, the breaker closes,
+    otherwise it opens again.
+    """
+
+    def __init__(
+        self, threshold: int = 5, window: float = 30.0, cooldown: float = 30.0
+    ) -> None:
+        """
+        :param threshold: Number of failures that opens the breaker.
+        :type threshold: int
+        :param window: Seconds within which failures are counted.
+        :type window: float
+        :param cooldown: Seconds until a probe request is let through.
+        :type cooldown: float
+        """
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.failures = collections.deque()
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Decide whether a request may be sent now.
+
+        :return: False if the breaker is open (or a probe is already under way).
+        :rtype: bool
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if (
+                self.state == OPEN
+                and time.monotonic() >= self.opened_at + self.cooldown
+            ):
+                self.state = HALF_OPEN
+                self._probing = False
+
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+
+                return True
+
+            return False
+
+    def record_success(self) -> None:
+        """
+        Record a successful request, closing the breaker if it was probing.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self.failures.clear()
+
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed request, opening the breaker if there were too many.
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            self.failures.append(now)
+
+            while self.failures and self.failures[0] < now - self.window:
+                self.failures.popleft()
+
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and len(self.failures) >= self.threshold
+            ):
+                self.state = OPEN
+                self.opened_at = now
+                self.trips += 1
+
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: State, number of recent failures and number of times the breaker
+            opened.
+        :rtype: Dict[str, Any]
+        """
+        with self._lock:
+            return dict(
+                state=self.state, recent_failures=len(self.failures), trips=self.trips
+            )
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def set_breaker(
+    provider: str, threshold: int = 5, window: float = 30.0, cooldown: float = 30.0
+) -> CircuitBreaker:
+    """
+    Enable a circuit breaker shared by all Threads of a provider.
+
+    :param provider: Provider name, e.g., "openai".
+    :type provider: str
+    :return: The new breaker.
+    :rtype: CircuitBreaker
+    """
+    _breakers[provider] = breaker = CircuitBreaker(threshold, window, cooldown)
+
+    return breaker
+
+
+def get_breaker(provider: str) -> Optional[CircuitBreaker]:
+    """
+    :return: The provider's circuit breaker, if enabled.
+    :rtype: Optional[CircuitBreaker]
+    """
+    return _breakers.get(provider)
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import pickle
+import collections
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+MODES = ("record", "replay", "replay-or-fetch")
+
+
+class CacheMiss(LookupError):
+    """
+    Raised in "replay" mode if a response is not in the cache.
+    """
+
+
+class ResponseCache:
+    """
+    Content-addressed disk cache for LLM responses.
+
+    Each response is pickled into a file named after the hash of the request. Files
+    are touched when read, so that the least recently used ones are evicted first
+    once the cache grows beyond `max_bytes`.
+
+    Modes:
+
+    - "record": always contact the provider, store every response.
+    - "replay": only serve responses from the cache, raise CacheMiss otherwise.
+    - "replay-or-fetch": serve from the cache if possible, otherwise contact the
+      provider and store the response.
+
+    Sampled requests (see occurrence_key) are cached per occurrence, so that
+    repeating a request yields fresh samples rather than copies of the first one.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".ego_cache",
+        mode: str = "replay-or-fetch",
+        max_bytes: int = 1 << 30,
+    ) -> None:
+        """
+        :param directory: Directory the cache is stored in.
+        :type directory: str
+        :param mode: One of "record", "replay", and "replay-or-fetch".
+        :type mode: str
+        :param max_bytes: Size of the cache beyond which entries are evicted.
+        :type max_bytes: int
+        :raises ValueError: If the mode is invalid.
+        """
+        if mode not in MODES:
+            raise ValueError(f'Invalid cache mode "{mode}".')
+
+        self.directory = Path(directory)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._occurrences: Dict[str, int] = collections.Counter()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(f.stat().st_size for f in self._entries())
+
+    def _entries(self):
+        return self.directory.glob("*/*.pkl")
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pkl"
+
+    @staticmethod
+    def key(**request: Any) -> str:
+        """
+        Hash a request, e.g., provider, model, messages, temperature, max_tokens
+        and options.
+
+        :return: Hexadecimal SHA-256 digest of the canonical JSON representation.
+        :rtype: str
+        """
+        canonical = json.dumps(request, sort_keys=True, default=repr)
+
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def occurrence_key(self, key: str) -> str:
+        """
+        Key of the next occurrence of a request whose response is sampled (e.g.,
+        at a temperature above 0). The n-th identical request made while this
+        cache is in use gets the n-th cached response, so that replications are
+        distinct samples (and are replayed as such).
+
+        :param key: Key as returned by ResponseCache.key.
+        :type key: str
+        :return: The key of this occurrence (the key itself for the first one).
+        :rtype: str
+        """
+        with self._lock:
+            n = self._occurrences[key]
+            self._occurrences[key] += 1
+
+        return key if n == 0 else self.key(request=key, occurrence=n)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        :param key: Key as returned by ResponseCache.key.
+        :type key: str
+        :return: The cached response, or None.
+        :rtype: Optional[Any]
+        :raises CacheMiss: In "replay" mode, if the key is not in the cache.
+        """
+        if self.mode == "record":
+            return None
+
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as fp:
+                response = pickle.load(fp)
+
+            os.utime(path)
+
+            return response
+        except FileNotFoundError:
+            if self.mode == "replay":
+                raise CacheMiss(f"Response {key} is not in the cache.")
+
+            return None
+
+    def put(self, key: str, response: Any) -> None:
+        """
+        Store a response, evicting least recently used entries if necessary.
+
+        :param key: Key as returned by ResponseCache.key.
+        :type key: str
+        :param response: The response (must be picklable).
+        :type response: Any
+        """
+        if self.mode == "replay":
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+
+        with open(tmp, "wb") as fp:
+            pickle.dump(response, fp)
+
+        with self._lock:
+            self._size -= path.stat().st_size if path.exists() else 0
+            self._size += tmp.stat().st_size
+            os.replace(tmp, path)
+
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def evict(self) -> None:
+        """
+        Delete least recently used entries until the cache fits into max_bytes.
+        """
+        entries = sorted(
+            ((f.stat(), f) for f in self._entries()), key=lambda e: e[0].st_mtime
+        )
+        self._size = sum(stat.st_size for stat, _ in entries)
+
+        for stat, f in entries:
+            if self._size <= self.max_bytes:
+                break
+
+            f.unlink(missing_ok=True)
+            self._size -= stat.st_size
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def set_cache(cache: Optional[ResponseCache]) -> None:
+    """
+    Enable (or, with None, disable) the response cache for all API Threads.
+
+    :param cache: The cache to use.
+    :type cache: Optional[ResponseCache]
+    """
+    global _cache
+
+    _cache = cache
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """
+    :return: The response cache in use, if any.
+    :rtype: Optional[ResponseCache]
+    """
+    return _cache
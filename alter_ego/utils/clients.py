@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+_clients: Dict[Hashable, Any] = {}
+_async_clients: (
+    "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, Any]]"
+) = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_client(
+    key: Tuple[Hashable, ...],
+    factory: Callable[[], Any],
+    asynchronous: bool = False,
+) -> Any:
+    """
+    Return a process-wide, shared client (and thus connection pool) for the given key.
+
+    Clients are created on first use and are never stored on Threads, so they are
+    not pickled. Asynchronous clients are bound to an event loop and hence pooled
+    per running loop.
+
+    :param key: Identifies the client, typically (provider, base URL, API key).
+    :type key: Tuple[Hashable, ...]
+    :param factory: Creates a new client if none exists for the key yet.
+    :type factory: Callable[[], Any]
+    :param asynchronous: Whether an asynchronous client is requested. Must then be
+        called from within a running event loop.
+    :type asynchronous: bool
+    :return: The shared client.
+    :rtype: Any
+    """
+    with _lock:
+        if asynchronous:
+            pool = _async_clients.setdefault(asyncio.get_running_loop(), {})
+        else:
+            pool = _clients
+
+        if key not in pool:
+            pool[key] = factory()
+
+        return pool[key]
+
+
+def close_clients() -> None:
+    """
+    Close and forget all synchronous clients in the pool.
+    """
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+
+    for client in clients:
+        close = getattr(client, "close", None)
+
+        if close is not None:
+            close()
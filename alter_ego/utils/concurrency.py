@@ -0,0 +1,228 @@
+import asyncio
+import contextlib
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import alter_ego.utils.retry
+
+TIMEOUT_NAMES = {"APITimeoutError", "ReadTimeout", "Timeout", "TimeoutException"}
+
+
+def is_congestion(exc: BaseException) -> bool:
+    """
+    Decide whether a failure signals overload: rate limits (429), overloaded
+    servers (503, 529) and timeouts.
+
+    :param exc: The exception.
+    :type exc: BaseException
+    :rtype: bool
+    """
+    if isinstance(exc, TimeoutError):
+        return True
+
+    if alter_ego.utils.retry.status_code(exc) in (429, 503, 529):
+        return True
+
+    return any(cls.__name__ in TIMEOUT_NAMES for cls in type(exc).__mro__)
+
+
+class AdaptiveLimiter:
+    """
+    Limits the number of concurrent requests, adapting the limit AIMD-style:
+    the limit grows by about one per round of successful requests while latency
+    stays within `tolerance` times the best latency seen, and is multiplied by
+    `decrease` on rate limits and timeouts (at most once per `backoff_interval`,
+    so that a burst of failures from one round only counts once).
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        minimum: float = 1,
+        maximum: float = 64,
+        decrease: float = 0.5,
+        tolerance: float = 2.0,
+        backoff_interval: float = 1.0,
+    ) -> None:
+        """
+        :param initial: Initial limit.
+        :type initial: float
+        :param minimum: Lowest limit.
+        :type minimum: float
+        :param maximum: Highest limit.
+        :type maximum: float
+        :param decrease: Factor applied to the limit on congestion.
+        :type decrease: float
+        :param tolerance: Latency, relative to the best latency seen, up to which
+            the limit may grow.
+        :type tolerance: float
+        :param backoff_interval: Minimum seconds between two decreases.
+        :type backoff_interval: float
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.backoff_interval = backoff_interval
+        self.in_flight = 0
+        self.baseline: Optional[float] = None  # best smoothed latency
+        self.latency: Optional[float] = None  # smoothed latency
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        """
+        Take a slot if one is free.
+
+        :return: Whether a slot was taken.
+        :rtype: bool
+        """
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+
+                return True
+
+            return False
+
+    def acquire(self) -> None:
+        """
+        Take a slot, waiting until one is free.
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+
+            self.in_flight += 1
+
+    async def aacquire(self) -> None:
+        """
+        Asynchronous version of acquire.
+        """
+        delay = 0.001
+
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(0.05, delay * 2)
+
+    def release(
+        self, latency: Optional[float] = None, exc: Optional[BaseException] = None
+    ) -> None:
+        """
+        Free a slot and adapt the limit to the outcome of the request.
+
+        :param latency: Duration of the request in seconds.
+        :type latency: Optional[float]
+        :param exc: The exception raised by the request, None if it succeeded.
+        :type exc: Optional[BaseException]
+        """
+        with self._cond:
+            self.in_flight -= 1
+
+            if exc is not None and is_congestion(exc):
+                now = time.monotonic()
+
+                if now - self._last_decrease >= self.backoff_interval:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.decreases += 1
+                    self._last_decrease = now
+            elif exc is None and latency is not None:
+                self.latency = (
+                    latency
+                    if self.latency is None
+                    else 0.8 * self.latency + 0.2 * latency
+                )
+                self.baseline = min(self.baseline or self.latency, self.latency)
+
+                if self.latency <= self.tolerance * self.baseline:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                    self.increases += 1
+
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Context manager holding a slot for the duration of a request.
+        """
+        self.acquire()
+        start = time.monotonic()
+
+        try:
+            yield
+        except BaseException as e:
+            self.release(time.monotonic() - start, e)
+            raise
+        else:
+            self.release(time.monotonic() - start)
+
+    @contextlib.asynccontextmanager
+    async def aslot(self) -> AsyncIterator[None]:
+        """
+        Asynchronous version of slot.
+        """
+        await self.aacquire()
+        start = time.monotonic()
+
+        try:
+            yield
+        except BaseException as e:
+            self.release(time.monotonic() - start, e)
+            raise
+        else:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Current limit, requests in flight, smoothed and best latency,
+            and numbers of increases and decreases.
+        :rtype: Dict[str, Any]
+        """
+        with self._cond:
+            return dict(
+                limit=self.limit,
+                in_flight=self.in_flight,
+                latency=self.latency,
+                baseline=self.baseline,
+                increases=self.increases,
+                decreases=self.decreases,
+            )
+
+
+@contextlib.asynccontextmanager
+async def unlimited() -> AsyncIterator[None]:
+    """
+    Asynchronous context manager that does not limit anything.
+    """
+    yield
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def set_adaptive_concurrency(provider: str, **kwargs: Any) -> AdaptiveLimiter:
+    """
+    Enable adaptive concurrency control for all Threads of a provider.
+
+    :param provider: Provider name, e.g., "openai".
+    :type provider: str
+    :param kwargs: Passed to AdaptiveLimiter.
+    :type kwargs: Any
+    :return: The new limiter.
+    :rtype: AdaptiveLimiter
+    """
+    _limiters[provider] = limiter = AdaptiveLimiter(**kwargs)
+
+    return limiter
+
+
+def get_concurrency_limiter(provider: str) -> Optional[AdaptiveLimiter]:
+    """
+    :return: The provider's adaptive concurrency limiter, if enabled.
+    :rtype: Optional[AdaptiveLimiter]
+    """
+    return _limiters.get(provider)
@@ -0,0 +1,275 @@
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+
+class HedgeCancelled(Exception):
+    """
+    Logged for a hedged duplicate that was cancelled because the original request
+    finished first. The provider bills it all the same; its usage is unknown and
+    is taken to be that of the response that was used (`completion`).
+    """
+
+    def __init__(self, completion: Any = None) -> None:
+        """
+        :param completion: The response that was used.
+        :type completion: Any
+        """
+        super().__init__("Cancelled after the original request finished first")
+        self.completion = completion
+
+
+class LatencyTracker:
+    """
+    Recent request latencies and hedging statistics of one provider (or model).
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        """
+        :param window: Number of recent latencies to keep.
+        :type window: int
+        """
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float) -> None:
+        """
+        Record the latency of an original (not duplicated) request, even if its
+        duplicate finished first, so that hedging does not bias the latencies
+        downward.
+
+        :param latency: Seconds until the response arrived.
+        :type latency: float
+        """
+        with self._lock:
+            self.latencies.append(latency)
+
+    def record(self, hedged: bool = False, won: bool = False) -> None:
+        """
+        Record a completed request.
+
+        :param hedged: Whether a duplicate was fired.
+        :type hedged: bool
+        :param won: Whether the duplicate finished first.
+        :type won: bool
+        """
+        with self._lock:
+            self.requests += 1
+            self.hedged += hedged
+            self.hedge_wins += won
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        :param q: Quantile between 0 and 1.
+        :type q: float
+        :return: The (nearest-rank) quantile of recent latencies, None without data.
+        :rtype: Optional[float]
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+
+        if not latencies:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: Numbers of requests, hedged requests and hedges that won, the hedge
+            rate and the median latency.
+        :rtype: Dict[str, Any]
+        """
+        with self._lock:
+            requests, hedged, wins = self.requests, self.hedged, self.hedge_wins
+
+        return dict(
+            requests=requests,
+            hedged=hedged,
+            hedge_wins=wins,
+            hedge_rate=hedged / requests if requests else 0.0,
+            median_latency=self.percentile(0.5),
+        )
+
+
+_trackers: Dict[Tuple[str, Optional[str]], LatencyTracker] = {}
+_lock = threading.Lock()
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_background: Set[asyncio.Future] = set()  # original requests outlasting their duplicate
+
+MAX_WORKERS = 64
+
+
+def get_tracker(provider: str, model: Optional[str] = None) -> LatencyTracker:
+    """
+    :return: The process-wide latency tracker for the provider and model.
+    :rtype: LatencyTracker
+    """
+    with _lock:
+        if (provider, model) not in _trackers:
+            _trackers[(provider, model)] = LatencyTracker()
+
+        return _trackers[(provider, model)]
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """
+    :return: Hedging statistics by "provider/model".
+    :rtype: Dict[str, Dict[str, Any]]
+    """
+    with _lock:
+        trackers = list(_trackers.items())
+
+    return {f"{p}/{m}": tracker.stats() for (p, m), tracker in trackers}
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                MAX_WORKERS, thread_name_prefix="ego-hedge"
+            )
+
+        return _executor
+
+
+def hedged_call(
+    call: Callable[[], Any],
+    after: Optional[float],
+    tracker: LatencyTracker,
+    before_hedge: Optional[Callable[[], Any]] = None,
+) -> Any:
+    """
+    Perform a call; if it takes longer than `after` seconds, fire a duplicate and
+    return whichever finishes first (if `after` is None, just perform the call).
+    Synchronous calls cannot be interrupted, so the slower one runs to completion
+    in the background and its result is discarded.
+
+    :param call: The call (an attempt of a request).
+    :type call: Callable[[], Any]
+    :param after: Seconds after which the duplicate is fired.
+    :type after: Optional[float]
+    :param tracker: Records the latency and whether the call was hedged.
+    :type tracker: LatencyTracker
+    :param before_hedge: Called before firing the duplicate, e.g., to throttle.
+    :type before_hedge: Optional[Callable[[], Any]]
+    :return: Result of the first successful call.
+    :rtype: Any
+    :raises Exception: The first call's exception, if both calls fail.
+    """
+    if after is None:
+        start = time.monotonic()
+        result = call()
+        tracker.observe(time.monotonic() - start)
+
+        return _finish(result, tracker)
+
+    executor = _get_executor()
+    start = time.monotonic()
+    primary = executor.submit(call)
+    primary.add_done_callback(lambda future: _observe(future, start, tracker))
+
+    if primary in concurrent.futures.wait([primary], timeout=after).done:
+        return _finish(primary.result(), tracker)
+
+    if before_hedge is not None:
+        before_hedge()
+
+    pending = {primary, executor.submit(call)}
+
+    while pending:
+        done, pending = concurrent.futures.wait(
+            pending, return_when=concurrent.futures.FIRST_COMPLETED
+        )
+
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+
+                return _finish(future.result(), tracker, True, future is not primary)
+
+    return primary.result()  # both failed
+
+
+async def ahedged_call(
+    call: Callable[[], Awaitable[Any]],
+    after: Optional[float],
+    tracker: LatencyTracker,
+    before_hedge: Optional[Callable[[], Awaitable[Any]]] = None,
+    on_cancel: Optional[Callable[[HedgeCancelled, float], Any]] = None,
+) -> Any:
+    """
+    Asynchronous version of hedged_call. If the duplicate finishes first, the
+    original call runs to completion in the background, so that its latency is
+    recorded; if the original call finishes first, the duplicate is cancelled.
+
+    :param on_cancel: Called with a HedgeCancelled and the time the cancelled
+        duplicate started (time.time()), e.g., to log its cost.
+    :type on_cancel: Optional[Callable[[HedgeCancelled, float], Any]]
+    """
+    if after is None:
+        start = time.monotonic()
+        result = await call()
+        tracker.observe(time.monotonic() - start)
+
+        return _finish(result, tracker)
+
+    start = time.monotonic()
+    primary = asyncio.ensure_future(call())
+    primary.add_done_callback(lambda task: _observe(task, start, tracker))
+    pending = {primary}
+
+    try:
+        done, _ = await asyncio.wait(pending, timeout=after)
+
+        if done:
+            return _finish(primary.result(), tracker)
+
+        if before_hedge is not None:
+            await before_hedge()
+
+        started = time.time()
+        duplicate = asyncio.ensure_future(call())
+        pending.add(duplicate)
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            for task in done:
+                if task.exception() is None:
+                    if primary in pending:
+                        pending.remove(primary)
+                        _background.add(primary)
+                        primary.add_done_callback(_background.discard)
+                    elif duplicate in pending and on_cancel is not None:
+                        on_cancel(HedgeCancelled(task.result()), started)
+
+                    return _finish(task.result(), tracker, True, task is not primary)
+
+        return primary.result()  # both failed
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _observe(future: Any, start: float, tracker: LatencyTracker) -> None:
+    if not future.cancelled() and future.exception() is None:
+        tracker.observe(time.monotonic() - start)
+
+
+def _finish(
+    result: Any, tracker: LatencyTracker, hedged: bool = False, won: bool = False
+) -> Any:
+    tracker.record(hedged, won)
+
+    return result
@@ -0,0 +1,326 @@
+import collections
+import contextlib
+import json
+import math
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# upper bounds of the latency histogram's buckets, in seconds
+BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+# seconds over which tokens per second are measured
+RATE_WINDOW = 60.0
+
+Labels = Tuple[str, str]
+
+COUNTERS = {
+    "requests": "Calls to the provider, including failed ones.",
+    "errors": "Failed calls.",
+    "retries": "Retries after transient errors.",
+    "cache_hits": "Responses served from the response cache.",
+    "failovers": "Requests that failed over to another provider.",
+    "prompt_tokens": "Prompt tokens reported by the provider.",
+    "completion_tokens": "Completion tokens reported by the provider.",
+}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def label(provider: str, model: str, **extra: str) -> str:
+    """
+    :return: Labels in the Prometheus text format.
+    :rtype: str
+    """
+    pairs = dict(provider=provider, model=model) | extra
+
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + "}"
+
+
+class _Series:
+    """
+    All metrics for one combination of labels.
+    """
+
+    def __init__(self) -> None:
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.errors_by_class: Dict[str, int] = collections.Counter()
+        self.buckets = [0] * len(BUCKETS)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.in_flight = 0
+        self.recent_tokens = collections.deque()  # (time, completion tokens)
+
+    def tokens_per_second(self, now: float, started: float) -> float:
+        while self.recent_tokens and self.recent_tokens[0][0] < now - RATE_WINDOW:
+            self.recent_tokens.popleft()
+
+        window = min(RATE_WINDOW, now - started) or 1.0
+
+        return sum(tokens for _, tokens in self.recent_tokens) / window
+
+
+class Metrics:
+    """
+    Process-wide registry of request metrics, labelled by provider and model:
+    counters (requests, errors, retries, cache hits, failovers, tokens), a
+    latency histogram, in-flight gauges and completion tokens per second.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self._series: Dict[Labels, _Series] = collections.defaultdict(_Series)
+        self._lock = threading.Lock()
+
+    def _labels(self, provider: str, model: Optional[str]) -> Labels:
+        return (provider, model or "")
+
+    def count(
+        self, provider: str, model: Optional[str], name: str, value: int = 1
+    ) -> None:
+        """
+        Increment a counter.
+
+        :param name: One of COUNTERS.
+        :type name: str
+        """
+        with self._lock:
+            self._series[self._labels(provider, model)].counters[name] += value
+
+    def observe(self, provider: str, model: Optional[str], record: Any) -> None:
+        """
+        Record a call.
+
+        :param record: CallRecord of the call (see alter_ego.utils.records).
+        :type record: Any
+        """
+        now = time.time()
+
+        with self._lock:
+            series = self._series[self._labels(provider, model)]
+
+            if record.cached:
+                series.counters["cache_hits"] += 1
+
+                return
+
+            series.counters["requests"] += 1
+
+            if record.error is not None:
+                series.counters["errors"] += 1
+                series.errors_by_class[record.error] += 1
+
+            if record.latency is not None:
+                series.latency_sum += record.latency
+                series.latency_count += 1
+
+                for i, bound in enumerate(BUCKETS):
+                    if record.latency <= bound:
+                        series.buckets[i] += 1
+                        break
+
+            series.counters["prompt_tokens"] += record.prompt_tokens or 0
+            series.counters["completion_tokens"] += record.completion_tokens or 0
+
+            if record.completion_tokens:
+                series.recent_tokens.append((now, record.completion_tokens))
+
+    @contextlib.contextmanager
+    def in_flight(self, provider: str, model: Optional[str]) -> Iterator[None]:
+        """
+        Context manager counting a request as in flight.
+        """
+        labels = self._labels(provider, model)
+
+        with self._lock:
+            self._series[labels].in_flight += 1
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._series[labels].in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        :return: Current values of all metrics, by "provider/model".
+        :rtype: Dict[str, Any]
+        """
+        now = time.time()
+        series = {}
+
+        with self._lock:
+            for (provider, model), s in sorted(self._series.items()):
+                series[f"{provider}/{model}"] = dict(
+                    provider=provider,
+                    model=model,
+                    **s.counters,
+                    errors_by_class=dict(s.errors_by_class),
+                    in_flight=s.in_flight,
+                    latency_mean=(
+                        s.latency_sum / s.latency_count if s.latency_count else None
+                    ),
+                    latency_buckets={
+                        str(bound): count for bound, count in zip(BUCKETS, s.buckets)
+                    },
+                    tokens_per_second=s.tokens_per_second(now, self.started),
+                )
+
+        return dict(t=now, uptime=now - self.started, series=series)
+
+    def prometheus(self) -> str:
+        """
+        :return: All metrics in the Prometheus text exposition format.
+        :rtype: str
+        """
+        now = time.time()
+        lines: List[str] = []
+
+        with self._lock:
+            items = sorted(self._series.items())
+
+            for name, help in COUNTERS.items():
+                lines.append(f"# HELP ego_{name}_total {help}")
+                lines.append(f"# TYPE ego_{name}_total counter")
+
+                for (provider, model), s in items:
+                    lines.append(
+                        f"ego_{name}_total{label(provider, model)} {s.counters[name]}"
+                    )
+
+            lines.append("# HELP ego_errors_by_class_total Failed calls by exception.")
+            lines.append("# TYPE ego_errors_by_class_total counter")
+
+            for (provider, model), s in items:
+                for error, count in sorted(s.errors_by_class.items()):
+                    lines.append(
+                        f"ego_errors_by_class_total{label(provider, model, error=error)} {count}"
+                    )
+
+            lines.append("# HELP ego_in_flight Requests currently in flight.")
+            lines.append("# TYPE ego_in_flight gauge")
+
+            for (provider, model), s in items:
+                lines.append(f"ego_in_flight{label(provider, model)} {s.in_flight}")
+
+            lines.append(
+                "# HELP ego_tokens_per_second Completion tokens per second, "
+                f"over the last {RATE_WINDOW:g} seconds."
+            )
+            lines.append("# TYPE ego_tokens_per_second gauge")
+
+            for (provider, model), s in items:
+                lines.append(
+                    f"ego_tokens_per_second{label(provider, model)} {s.tokens_per_second(now, self.started)}"
+                )
+
+            lines.append("# HELP ego_request_latency_seconds Latency of calls.")
+            lines.append("# TYPE ego_request_latency_seconds histogram")
+
+            for (provider, model), s in items:
+                cumulative = 0
+
+                for bound, count in zip(BUCKETS, s.buckets):
+                    cumulative += count
+                    le = "+Inf" if math.isinf(bound) else f"{bound:g}"
+                    lines.append(
+                        f"ego_request_latency_seconds_bucket{label(provider, model, le=le)} {cumulative}"
+                    )
+
+                lines.append(
+                    f"ego_request_latency_seconds_sum{label(provider, model)} {s.latency_sum}"
+                )
+                lines.append(
+                    f"ego_request_latency_seconds_count{label(provider, model)} {s.latency_count}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """
+        Discard all metrics.
+        """
+        with self._lock:
+            self._series.clear()
+            self.started = time.time()
+
+
+metrics = Metrics()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/metrics":
+            body = metrics.prometheus().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body = json.dumps(metrics.snapshot()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve the metrics in a background thread, in Prometheus text format at
+    /metrics and as JSON at /metrics.json.
+
+    :param port: Port to listen on.
+    :type port: int
+    :param host: Interface to listen on.
+    :type host: str
+    :return: The server, call shutdown() to stop it.
+    :rtype: ThreadingHTTPServer
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def dump_periodically(path: str, interval: float = 60.0) -> threading.Event:
+    """
+    Append a JSON snapshot of the metrics to a JSONL file at regular intervals,
+    in a background thread.
+
+    :param path: File to append to.
+    :type path: str
+    :param interval: Seconds between two snapshots.
+    :type interval: float
+    :return: An event; set it to stop dumping (a final snapshot is written).
+    :rtype: threading.Event
+    """
+    stop = threading.Event()
+
+    def dump() -> None:
+        while True:
+            stopped = stop.wait(interval)
+
+            try:
+                with open(path, "a") as fp:
+                    fp.write(json.dumps(metrics.snapshot()) + "\n")
+            except OSError as e:
+                print(f"Could not write metrics: {e}", file=sys.stderr)
+
+            if stopped:
+                break
+
+    threading.Thread(target=dump, daemon=True).start()
+
+    return stop
@@ -0,0 +1,272 @@
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+
+from alter_ego.utils.simulation import SimulatedError, Simulator
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(
+        self, status: int, body: Any, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        data = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content_type: str, lines: Iterator[str]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            for line in lines:
+                self.wfile.write(line.encode())
+                self.wfile.flush()
+
+                if self.server.chunk_delay:
+                    time.sleep(self.server.chunk_delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client cancelled the stream
+
+    def _send_error(self, error: SimulatedError) -> None:
+        self._send_json(
+            error.status_code,
+            dict(error=dict(message=str(error), type="simulated", code=None)),
+            error.response.headers,
+        )
+
+    def do_GET(self) -> None:
+        if self.path.endswith("/models"):
+            self._send_json(200, dict(object="list", data=[]))
+        elif self.path == "/api/version":
+            self._send_json(200, dict(version="0.0.0"))
+        elif self.path == "/api/tags":
+            self._send_json(200, dict(models=[]))
+        else:
+            self._send_json(404, dict(error=dict(message="Not found")))
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        with self.server.lock:
+            self.server.requests += 1
+
+        time.sleep(self.server.simulator.draw_latency())
+
+        if (error := self.server.simulator.fault()) is not None:
+            self._send_error(error)
+        elif self.path.endswith("/chat/completions"):
+            self._openai(body)
+        elif self.path == "/api/chat":
+            self._ollama(body)
+        else:
+            self._send_json(404, dict(error=dict(message="Not found")))
+
+    def _openai(self, body: Dict[str, Any]) -> None:
+        messages = body.get("messages", [])
+        texts = [
+            self.server.simulator.respond(messages) for _ in range(body.get("n") or 1)
+        ]
+        usage = Simulator.usage(messages, "".join(texts))
+        head = dict(
+            id=f"chatcmpl-{uuid.uuid4().hex}",
+            created=int(time.time()),
+            model=body.get("model", "simulated"),
+            system_fingerprint=None,
+        )
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+            def lines() -> Iterator[str]:
+                for i, text in enumerate(texts):
+                    for piece in Simulator.chunks(text):
+                        delta = dict(role="assistant", content=piece)
+                        choice = dict(index=i, delta=delta, finish_reason=None)
+                        chunk = head | dict(
+                            object="chat.completion.chunk", choices=[choice]
+                        )
+                        yield f"data: {json.dumps(chunk)}\n\n"
+
+                    choice = dict(index=i, delta={}, finish_reason="stop")
+                    chunk = head | dict(
+                        object="chat.completion.chunk", choices=[choice]
+                    )
+                    yield f"data: {json.dumps(chunk)}\n\n"
+
+                if include_usage:
+                    chunk = head | dict(
+                        object="chat.completion.chunk", choices=[], usage=usage
+                    )
+                    yield f"data: {json.dumps(chunk)}\n\n"
+
+                yield "data: [DONE]\n\n"
+
+            self._send_stream("text/event-stream", lines())
+        else:
+            choices = [
+                dict(
+                    index=i,
+                    message=dict(role="assistant", content=text),
+                    finish_reason="stop",
+                    logprobs=None,
+                )
+                for i, text in enumerate(texts)
+            ]
+
+            self._send_json(
+                200,
+                head | dict(object="chat.completion", choices=choices, usage=usage),
+            )
+
+    def _ollama(self, body: Dict[str, Any]) -> None:
+        messages = body.get("messages", [])
+        text = self.server.simulator.respond(messages)
+        usage = Simulator.usage(messages, text)
+        head = dict(
+            model=body.get("model", "simulated"),
+            created_at=datetime.now(timezone.utc).isoformat(),
+        )
+        final = head | dict(
+            done=True,
+            done_reason="stop",
+            prompt_eval_count=usage["prompt_tokens"],
+            eval_count=usage["completion_tokens"],
+        )
+
+        if body.get("stream", True):
+
+            def lines() -> Iterator[str]:
+                for piece in Simulator.chunks(text):
+                    message = dict(role="assistant", content=piece)
+                    yield json.dumps(head | dict(message=message, done=False)) + "\n"
+
+                message = dict(role="assistant", content="")
+                yield json.dumps(final | dict(message=message)) + "\n"
+
+            self._send_stream("application/x-ndjson", lines())
+        else:
+            message = dict(role="assistant", content=text)
+            self._send_json(200, final | dict(message=message))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    simulator: Simulator
+    chunk_delay: float
+    requests: int
+    lock: threading.Lock
+
+
+class MockServer:
+    """
+    Local HTTP server imitating the OpenAI (and OpenRouter) chat completions API
+    and the Ollama chat API, for offline benchmarks and load tests.
+
+    Responses, latency and failures are determined by a Simulator. Point
+    GPTThread at `url + "/v1"` with `extra_for_client=[("base_url", ...)]`,
+    OpenRouterThread through its BASE_URL, and OllamaThread at `url` through
+    `endpoint` or `endpoints`.
+    """
+
+    def __init__(
+        self,
+        simulator: Optional[Simulator] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        chunk_delay: float = 0.0,
+    ) -> None:
+        """
+        :param simulator: Simulated model, echoes messages instantly by default.
+        :type simulator: Optional[Simulator]
+        :param host: Interface to listen on.
+        :type host: str
+        :param port: Port to listen on, 0 for any free port.
+        :type port: int
+        :param chunk_delay: Seconds between two chunks of a streamed response.
+        :type chunk_delay: float
+        """
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.simulator = simulator or Simulator()
+        self.httpd.chunk_delay = chunk_delay
+        self.httpd.requests = 0
+        self.httpd.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        :return: Base URL of the server.
+        :rtype: str
+        """
+        host, port = self.httpd.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        """
+        :return: Number of POST requests received so far.
+        :rtype: int
+        """
+        return self.httpd.requests
+
+    def start(self) -> "MockServer":
+        """
+        Serve in a background thread.
+
+        :return: The server itself.
+        :rtype: MockServer
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def serve_forever(self) -> None:
+        """
+        Serve in the current thread until interrupted.
+        """
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+    def stop(self) -> None:
+        """
+        Stop serving and close the socket.
+        """
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
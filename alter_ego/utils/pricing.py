@@ -0,0 +1,109 @@
+import threading
+import warnings
+from typing import Dict, Optional, Set, Tuple
+
+# USD per million (prompt, completion) tokens. Prices change; use set_price to
+# adjust them or to add models.
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4": (30.00, 60.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "o1": (15.00, 60.00),
+    "o1-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+    "o3-mini": (1.10, 4.40),
+    "o4-mini": (1.10, 4.40),
+}
+
+# fraction of the regular price charged for requests made through the Batch API
+BATCH_DISCOUNT = 0.5
+
+# providers that run models locally or not at all
+FREE_PROVIDERS: Set[str] = {"ollama", "simulated"}
+
+_warned: Set[str] = set()
+_lock = threading.Lock()
+
+
+def set_price(model: str, prompt: float, completion: float) -> None:
+    """
+    Set the price of a model. Also applies to its versions (e.g., "gpt-4o"
+    applies to "gpt-4o-2024-08-06") and to the same model on OpenRouter
+    ("openai/gpt-4o"), unless they are priced separately.
+
+    :param model: Model name.
+    :type model: str
+    :param prompt: USD per million prompt tokens.
+    :type prompt: float
+    :param completion: USD per million completion tokens.
+    :type completion: float
+    """
+    PRICES[model] = (prompt, completion)
+
+
+def get_price(model: Optional[str]) -> Optional[Tuple[float, float]]:
+    """
+    :param model: Model name.
+    :type model: Optional[str]
+    :return: USD per million prompt and completion tokens, None if unknown. The
+        longest matching prefix in PRICES is used.
+    :rtype: Optional[Tuple[float, float]]
+    """
+    if not model:
+        return None
+
+    for name in (model, model.split("/", 1)[-1]):
+        matches = [m for m in PRICES if name == m or name.startswith(m + "-")]
+
+        if matches:
+            return PRICES[max(matches, key=len)]
+
+    return None
+
+
+def call_cost(
+    provider: str,
+    model: Optional[str],
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    batch: bool = False,
+) -> float:
+    """
+    Cost of a single call. Unknown models are counted as free, with a warning.
+
+    :param provider: Provider name, e.g., "openai".
+    :type provider: str
+    :param model: Model name.
+    :type model: Optional[str]
+    :param prompt_tokens: Tokens in the prompt.
+    :type prompt_tokens: Optional[int]
+    :param completion_tokens: Tokens in the completion.
+    :type completion_tokens: Optional[int]
+    :param batch: Whether the call was made through the Batch API, which is
+        charged BATCH_DISCOUNT times the regular price.
+    :type batch: bool
+    :return: Cost in USD.
+    :rtype: float
+    """
+    if provider in FREE_PROVIDERS or not (prompt_tokens or completion_tokens):
+        return 0.0
+
+    if (price := get_price(model)) is None:
+        with _lock:
+            if model not in _warned:
+                _warned.add(model)
+                warnings.warn(
+                    f'No price known for model "{model}", counting it as free. '
+                    "Use alter_ego.utils.pricing.set_price."
+                )
+
+        return 0.0
+
+    cost = ((prompt_tokens or 0) * price[0] + (completion_tokens or 0) * price[1]) / 1e6
+
+    return cost * BATCH_DISCOUNT if batch else cost
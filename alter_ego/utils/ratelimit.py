@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously at a rate given per minute.
+
+    Capacity can be borrowed against: a reservation that exceeds the current level
+    leaves the bucket in debt, and the caller must wait until the debt is repaid.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        """
+        :param per_minute: Refill rate and capacity of the bucket.
+        :type per_minute: float
+        """
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.capacity / 60
+        )
+        self.updated = now
+
+    def wait_time(self, cost: float = 0) -> float:
+        """
+        :return: Seconds until `cost` units are available (refill must be called first).
+        :rtype: float
+        """
+        missing = min(cost, self.capacity) - self.level
+
+        return max(0.0, missing * 60 / self.capacity)
+
+    def take(self, cost: float) -> float:
+        """
+        Reserve `cost` units, possibly going into debt.
+
+        :return: Seconds the caller has to wait before using the reservation.
+        :rtype: float
+        """
+        wait = self.wait_time(cost)
+        self.level -= min(cost, self.capacity)
+
+        return wait
+
+
+class RateLimiter:
+    """
+    Shared limiter budgeting requests per minute and (estimated) tokens per minute.
+    """
+
+    def __init__(
+        self, rpm: Optional[float] = None, tpm: Optional[float] = None
+    ) -> None:
+        """
+        :param rpm: Requests per minute, None for no limit.
+        :type rpm: Optional[float]
+        :param tpm: Tokens per minute, None for no limit.
+        :type tpm: Optional[float]
+        """
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+
+    def _buckets(self, tokens: float):
+        return [
+            (bucket, cost)
+            for bucket, cost in ((self.requests, 1), (self.tokens, tokens))
+            if bucket is not None
+        ]
+
+    def wait_time(self, tokens: float = 0) -> float:
+        """
+        Current wait time for a request of the given size, without reserving anything.
+
+        :param tokens: Estimated tokens of the request.
+        :type tokens: float
+        :return: Seconds a request would have to wait now.
+        :rtype: float
+        """
+        with self._lock:
+            now = time.monotonic()
+            waits = [0.0]
+
+            for bucket, cost in self._buckets(tokens):
+                bucket.refill(now)
+                waits.append(bucket.wait_time(cost))
+
+            return max(waits)
+
+    def reserve(self, tokens: float = 0) -> float:
+        """
+        Reserve budget for one request.
+
+        :param tokens: Estimated tokens of the request.
+        :type tokens: float
+        :return: Seconds to wait before sending the request.
+        :rtype: float
+        """
+        with self._lock:
+            now = time.monotonic()
+            waits = [0.0]
+
+            for bucket, cost in self._buckets(tokens):
+                bucket.refill(now)
+                waits.append(bucket.take(cost))
+
+            return max(waits)
+
+    def acquire(self, tokens: float = 0) -> float:
+        """
+        Reserve budget for one request and sleep as long as required.
+
+        :return: Seconds waited.
+        :rtype: float
+        """
+        wait = self.reserve(tokens)
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    async def aacquire(self, tokens: float = 0) -> float:
+        """
+        Asynchronous version of acquire.
+
+        :return: Seconds waited.
+        :rtype: float
+        """
+        wait = self.reserve(tokens)
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        return wait
+
+
+_limiters: Dict[Tuple[str, Optional[str]], RateLimiter] = {}
+
+
+def set_rate_limit(
+    provider: str,
+    model: Optional[str] = None,
+    *,
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+) -> RateLimiter:
+    """
+    Configure the shared rate limit for a provider, or for one of its models.
+
+    :param provider: Provider name, e.g., "openai".
+    :type provider: str
+    :param model: Model name; None configures the default for the provider.
+    :type model: Optional[str]
+    :param rpm: Requests per minute, None for no limit.
+    :type rpm: Optional[float]
+    :param tpm: Tokens per minute, None for no limit.
+    :type tpm: Optional[float]
+    :return: The new limiter.
+    :rtype: RateLimiter
+    """
+    _limiters[(provider, model)] = limiter = RateLimiter(rpm=rpm, tpm=tpm)
+
+    return limiter
+
+
+def get_limiter(provider: str, model: Optional[str] = None) -> Optional[RateLimiter]:
+    """
+    :return: The limiter for the model if configured, otherwise the provider's
+        default limiter, otherwise None.
+    :rtype: Optional[RateLimiter]
+    """
+    return _limiters.get((provider, model), _limiters.get((provider, None)))
@@ -0,0 +1,212 @@
+from typing import Any, Dict, Optional
+
+
+def _get(obj: Any, *path: str) -> Any:
+    """Follow a path of attributes or keys, returning None if any is missing."""
+    for name in path:
+        if obj is None:
+            return None
+        elif isinstance(obj, dict):
+            obj = obj.get(name)
+        elif isinstance(obj, (list, tuple)):
+            obj = obj[int(name)] if len(obj) > int(name) else None
+        else:
+            obj = getattr(obj, name, None)
+
+    return obj
+
+
+def _first(obj: Any, *paths: str) -> Any:
+    for path in paths:
+        if (value := _get(obj, *path.split("."))) is not None:
+            return value
+
+    return None
+
+
+class CallRecord:
+    """
+    Compact record of one call to a provider (or of a response served from the
+    response cache). The raw response or exception is only retained on request.
+    """
+
+    __slots__ = (
+        "timestamp",
+        "latency",
+        "model",
+        "prompt_tokens",
+        "completion_tokens",
+        "finish_reason",
+        "error",
+        "cached",
+        "cost",
+        "raw",
+    )
+
+    def __init__(
+        self,
+        timestamp: float,
+        latency: Optional[float] = None,
+        model: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        finish_reason: Optional[str] = None,
+        error: Optional[str] = None,
+        cached: bool = False,
+        cost: Optional[float] = None,
+        raw: Any = None,
+    ) -> None:
+        """
+        :param timestamp: Time the call started (seconds since the epoch).
+        :type timestamp: float
+        :param latency: Duration of the call in seconds.
+        :type latency: Optional[float]
+        :param model: Model that produced the response.
+        :type model: Optional[str]
+        :param prompt_tokens: Tokens in the prompt, as reported by the provider.
+        :type prompt_tokens: Optional[int]
+        :param completion_tokens: Tokens in the completion, as reported by the provider.
+        :type completion_tokens: Optional[int]
+        :param finish_reason: Why the model stopped (of the first choice).
+        :type finish_reason: Optional[str]
+        :param error: Class name of the exception, if the call failed.
+        :type error: Optional[str]
+        :param cached: Whether the response was served from the response cache.
+        :type cached: bool
+        :param cost: Cost of the call in USD, if known.
+        :type cost: Optional[float]
+        :param raw: The raw response or exception, if retained.
+        :type raw: Any
+        """
+        self.timestamp = timestamp
+        self.latency = latency
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.finish_reason = finish_reason
+        self.error = error
+        self.cached = cached
+        self.cost = cost
+        self.raw = raw
+
+    @classmethod
+    def from_outcome(
+        cls,
+        outcome: Any,
+        timestamp: float,
+        latency: Optional[float] = None,
+        model: Optional[str] = None,
+        cached: bool = False,
+        keep_raw: bool = False,
+    ) -> "CallRecord":
+        """
+        Summarize a response (OpenAI, Ollama, TextSynth or simulated) or exception.
+        The usage of an exception's incomplete response (`completion`, see
+        FinishedEarly) is recorded.
+
+        :param outcome: The response or exception.
+        :type outcome: Any
+        :param timestamp: Time the call started (seconds since the epoch).
+        :type timestamp: float
+        :param latency: Duration of the call in seconds.
+        :type latency: Optional[float]
+        :param model: Model requested, used unless the response names one.
+        :type model: Optional[str]
+        :param cached: Whether the response was served from the response cache.
+        :type cached: bool
+        :param keep_raw: Whether to retain the outcome itself.
+        :type keep_raw: bool
+        :return: The record.
+        :rtype: CallRecord
+        """
+        raw = outcome if keep_raw else None
+
+        if isinstance(outcome, BaseException):
+            # incomplete responses (see FinishedEarly) are billed all the same
+            completion = getattr(outcome, "completion", None)
+
+            return cls(
+                timestamp,
+                latency,
+                _get(completion, "model") or model,
+                _get(completion, "usage", "prompt_tokens"),
+                _get(completion, "usage", "completion_tokens"),
+                _get(completion, "choices", "0", "finish_reason"),
+                error=type(outcome).__name__,
+                raw=raw,
+            )
+
+        finish_reason = _first(outcome, "choices.0.finish_reason", "done_reason")
+
+        if finish_reason is None and (end := _get(outcome, "reached_end")) is not None:
+            finish_reason = "stop" if end else "length"
+
+        return cls(
+            timestamp,
+            latency,
+            _get(outcome, "model") or model,
+            _first(outcome, "usage.prompt_tokens", "prompt_eval_count", "input_tokens"),
+            _first(outcome, "usage.completion_tokens", "eval_count", "output_tokens"),
+            finish_reason,
+            cached=cached,
+            raw=raw,
+        )
+
+    @property
+    def ok(self) -> bool:
+        """
+        :return: Whether the call succeeded.
+        :rtype: bool
+        """
+        return self.error is None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        :return: All fields except the raw outcome.
+        :rtype: Dict[str, Any]
+        """
+        return {name: getattr(self, name) for name in self.__slots__ if name != "raw"}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name in self.__slots__:
+            setattr(self, name, state.get(name))
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items())
+
+        return f"CallRecord({fields})"
+
+
+def timestamp(entry: Any) -> Optional[float]:
+    """
+    Time of a log entry, for both CallRecords and the raw responses logged by
+    earlier versions (which carry `created`).
+
+    :param entry: Entry of APIThread.log.
+    :type entry: Any
+    :return: Seconds since the epoch, None if unknown.
+    :rtype: Optional[float]
+    """
+    if isinstance(entry, CallRecord):
+        return entry.timestamp if entry.ok else None
+
+    return getattr(entry, "created", None)
+
+
+def as_record(entry: Any, model: Optional[str] = None) -> CallRecord:
+    """
+    :param entry: Entry of APIThread.log, possibly a raw response or exception
+        logged by an earlier version.
+    :type entry: Any
+    :param model: Model requested.
+    :type model: Optional[str]
+    :return: The entry as a CallRecord.
+    :rtype: CallRecord
+    """
+    if isinstance(entry, CallRecord):
+        return entry
+
+    return CallRecord.from_outcome(entry, timestamp(entry) or 0.0, model=model)
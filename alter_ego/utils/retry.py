@@ -0,0 +1,117 @@
+import email.utils
+import random
+import time
+from typing import Any, Optional
+
+TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 520, 522, 524, 529}
+TRANSIENT_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectError",
+    "ConnectTimeout",
+    "ConnectionError",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    "Timeout",
+    "TimeoutException",
+}
+
+
+class FinishedEarly(ValueError):
+    """
+    Raised when a model stops before completing its response (e.g., because of
+    the length limit or a content filter).
+    """
+
+    def __init__(self, message: str, completion: Any = None) -> None:
+        """
+        :param message: Description of the error.
+        :type message: str
+        :param completion: The incomplete response, which is billed all the same.
+        :type completion: Any
+        """
+        super().__init__(message)
+        self.completion = completion
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """
+    Extract the HTTP status code from an exception raised by any supported client.
+
+    :param exc: The exception.
+    :type exc: BaseException
+    :return: The status code, if any.
+    :rtype: Optional[int]
+    """
+    code = getattr(exc, "status_code", None)
+
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+
+    return code if isinstance(code, int) else None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Decide whether a failed request is worth retrying: rate limits, server errors,
+    timeouts and connection problems. Early finishes (FinishedEarly) are not,
+    since the length limit would cut off a billed retry just the same.
+
+    :param exc: The exception.
+    :type exc: BaseException
+    :rtype: bool
+    """
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+
+    if (code := status_code(exc)) is not None:
+        return code in TRANSIENT_STATUS
+
+    return any(cls.__name__ in TRANSIENT_NAMES for cls in type(exc).__mro__)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """
+    Extract the delay requested by the server through Retry-After(-ms) headers.
+
+    :param exc: The exception.
+    :type exc: BaseException
+    :return: The delay in seconds, if any.
+    :rtype: Optional[float]
+    """
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+
+    if not headers:
+        return None
+
+    try:
+        if (value := headers.get("retry-after-ms")) is not None:
+            return float(value) / 1000
+
+        if (value := headers.get("retry-after")) is not None:
+            try:
+                return float(value)
+            except ValueError:
+                when = email.utils.parsedate_to_datetime(value)
+
+                return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+
+    return None
+
+
+def backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Exponential backoff with full jitter.
+
+    :param attempt: Number of the failed attempt, starting at 0.
+    :type attempt: int
+    :param base: Backoff before jitter after the first failure.
+    :type base: float
+    :param cap: Maximum backoff.
+    :type cap: float
+    :return: Seconds to wait.
+    :rtype: float
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
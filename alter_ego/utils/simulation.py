@@ -0,0 +1,167 @@
+import random
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+Latency = Union[float, Tuple[float, float], Callable[[random.Random], float]]
+Responses = Union[None, str, Sequence[str], Callable[[List[Dict[str, str]]], str]]
+
+
+class SimulatedError(Exception):
+    """
+    Injected failure. Mimics the HTTP errors of real clients, so that it is
+    recognized (and retried) like them by alter_ego.utils.retry.
+    """
+
+    def __init__(
+        self, status_code: int, message: str, retry_after: Optional[float] = None
+    ) -> None:
+        super().__init__(status_code, message, retry_after)
+
+        self.status_code = status_code
+        self.response = SimpleNamespace(
+            status_code=status_code,
+            headers={} if retry_after is None else {"retry-after": str(retry_after)},
+        )
+
+    def __str__(self) -> str:
+        return f"{self.args[0]} {self.args[1]}"
+
+
+class Simulator:
+    """
+    Simulated LLM with configurable latency, failures and responses.
+
+    Latency is either a constant, a (low, high) tuple for a uniform distribution,
+    or a function drawing from the simulator's random number generator.
+
+    Responses are either None (echo the last message), a constant, a sequence
+    (returned in order and cycled, or drawn at random if `randomize`), or a
+    function of the messages.
+    """
+
+    def __init__(
+        self,
+        latency: Latency = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        responses: Responses = None,
+        randomize: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        :param latency: Seconds until a response is returned.
+        :type latency: Union[float, Tuple[float, float], Callable[[random.Random], float]]
+        :param error_rate: Probability of a server error (HTTP 500).
+        :type error_rate: float
+        :param rate_limit_rate: Probability of a rate limit error (HTTP 429).
+        :type rate_limit_rate: float
+        :param retry_after: Retry-After sent with rate limit errors, in seconds.
+        :type retry_after: float
+        :param responses: Scripted responses, see above.
+        :type responses: Union[None, str, Sequence[str], Callable]
+        :param randomize: Whether to draw responses from the sequence at random.
+        :type randomize: bool
+        :param seed: Seed of the random number generator.
+        :type seed: Optional[int]
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.responses = responses
+        self.randomize = randomize
+        self.rng = random.Random(seed)
+        self.served = 0  # position in the script
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__ |= state
+        self._lock = threading.Lock()
+
+    def draw_latency(self) -> float:
+        """
+        :return: Seconds the next response takes.
+        :rtype: float
+        """
+        with self._lock:
+            if callable(self.latency):
+                value = self.latency(self.rng)
+            elif isinstance(self.latency, (tuple, list)):
+                value = self.rng.uniform(*self.latency)
+            else:
+                value = self.latency
+
+        return max(0.0, float(value))
+
+    def fault(self) -> Optional[SimulatedError]:
+        """
+        :return: The failure to inject into the next request, if any.
+        :rtype: Optional[SimulatedError]
+        """
+        with self._lock:
+            draw = self.rng.random()
+
+        if draw < self.rate_limit_rate:
+            return SimulatedError(429, "Rate limit reached", self.retry_after)
+        elif draw < self.rate_limit_rate + self.error_rate:
+            return SimulatedError(500, "Internal server error")
+
+        return None
+
+    def respond(self, messages: List[Dict[str, str]]) -> str:
+        """
+        :param messages: Messages of the request, in OpenAI format.
+        :type messages: List[Dict[str, str]]
+        :return: The response.
+        :rtype: str
+        """
+        if self.responses is None:
+            return messages[-1]["content"] if messages else ""
+        elif isinstance(self.responses, str):
+            return self.responses
+        elif callable(self.responses):
+            return self.responses(messages)
+
+        with self._lock:
+            if self.randomize:
+                return self.rng.choice(self.responses)
+
+            index = self.served
+            self.served += 1
+
+            return self.responses[index % len(self.responses)]
+
+    @staticmethod
+    def usage(messages: List[Dict[str, str]], text: str) -> Dict[str, int]:
+        """
+        Estimate token usage (four characters per token).
+
+        :return: Prompt, completion and total tokens.
+        :rtype: Dict[str, int]
+        """
+        prompt = sum(len(m["content"]) for m in messages) // 4 + 1
+        completion = len(text) // 4 + 1
+
+        return dict(
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            total_tokens=prompt + completion,
+        )
+
+    @staticmethod
+    def chunks(text: str) -> List[str]:
+        """
+        :return: Pieces of the text as they would be streamed, one per word.
+        :rtype: List[str]
+        """
+        return [
+            piece if i == 0 else " " + piece for i, piece in enumerate(text.split(" "))
+        ]
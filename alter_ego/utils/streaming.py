@@ -0,0 +1,211 @@
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+)
+
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+
+if TYPE_CHECKING:  # ollama is only needed by OllamaThread
+    from ollama import ChatResponse
+
+# finish reason recorded when a stream was cancelled because stop_when was satisfied
+EARLY_STOP = "early_stop"
+
+StopPredicate = Optional[Callable[[str], bool]]
+
+
+class _Collector:
+    """
+    Accumulates streamed text and decides when to stop.
+    """
+
+    def __init__(self, stop_when: StopPredicate) -> None:
+        self.stop_when = stop_when
+        self.pieces = []
+        self.stopped = False
+
+    def add(self, piece: Optional[str]) -> bool:
+        if piece:
+            self.pieces.append(piece)
+
+            if self.stop_when is not None and self.stop_when(self.text):
+                self.stopped = True
+
+        return self.stopped
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pieces)
+
+
+def _openai_completion(
+    chunks: List[ChatCompletionChunk],
+    collector: _Collector,
+    prompt_tokens: Optional[int] = None,
+) -> ChatCompletion:
+    if not chunks:
+        raise RuntimeError("Stream ended without any response.")
+
+    finish_reason = EARLY_STOP if collector.stopped else None
+    usage = None
+
+    for chunk in chunks:
+        if chunk.choices and finish_reason is None:
+            finish_reason = chunk.choices[0].finish_reason
+
+        usage = chunk.usage or usage
+
+    if usage is None:
+        # the usage chunk comes last, so cancelled streams never receive it;
+        # estimate roughly, as APIThread.estimate_tokens does
+        completion_tokens = len(collector.text) // 4
+        usage = CompletionUsage(
+            prompt_tokens=prompt_tokens or 0,
+            completion_tokens=completion_tokens,
+            total_tokens=(prompt_tokens or 0) + completion_tokens,
+        )
+
+    # constructed without validation, as the API does not know EARLY_STOP
+    return ChatCompletion.model_construct(
+        id=chunks[0].id,
+        created=chunks[0].created,
+        model=chunks[0].model,
+        object="chat.completion",
+        system_fingerprint=chunks[0].system_fingerprint,
+        usage=usage,
+        choices=[
+            Choice.model_construct(
+                index=0,
+                message=ChatCompletionMessage(role="assistant", content=collector.text),
+                finish_reason=finish_reason,
+                logprobs=None,
+            )
+        ],
+    )
+
+
+def collect_openai(
+    stream: Any, stop_when: StopPredicate = None, prompt_tokens: Optional[int] = None
+) -> ChatCompletion:
+    """
+    Consume a streamed OpenAI-compatible chat completion, closing the stream as soon
+    as `stop_when` holds for the text received so far.
+
+    :param stream: Stream as returned by chat.completions.create(..., stream=True).
+    :type stream: Any
+    :param stop_when: Predicate on the accumulated text; None to read everything.
+    :type stop_when: Optional[Callable[[str], bool]]
+    :param prompt_tokens: Estimated prompt tokens, used if the stream ends before
+        reporting its usage (as it does when cancelled).
+    :type prompt_tokens: Optional[int]
+    :return: A chat completion containing exactly the text received. Its finish
+        reason is EARLY_STOP if the stream was cancelled, and its usage is
+        estimated if none was reported.
+    :rtype: ChatCompletion
+    """
+    collector = _Collector(stop_when)
+    chunks = []
+
+    try:
+        for chunk in stream:
+            chunks.append(chunk)
+            piece = chunk.choices[0].delta.content if chunk.choices else None
+
+            if collector.add(piece):
+                break
+    finally:
+        stream.close()
+
+    return _openai_completion(chunks, collector, prompt_tokens)
+
+
+async def acollect_openai(
+    stream: Any, stop_when: StopPredicate = None, prompt_tokens: Optional[int] = None
+) -> ChatCompletion:
+    """
+    Asynchronous version of collect_openai.
+    """
+    collector = _Collector(stop_when)
+    chunks = []
+
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+            piece = chunk.choices[0].delta.content if chunk.choices else None
+
+            if collector.add(piece):
+                break
+    finally:
+        await stream.close()
+
+    return _openai_completion(chunks, collector, prompt_tokens)
+
+
+def _ollama_response(
+    last: Optional["ChatResponse"], collector: _Collector
+) -> "ChatResponse":
+    from ollama import Message
+
+    if last is None:
+        raise RuntimeError("Stream ended without any response.")
+
+    return last.model_copy(
+        update=dict(
+            message=Message(role="assistant", content=collector.text),
+            done_reason=EARLY_STOP if collector.stopped else last.done_reason,
+        )
+    )
+
+
+def collect_ollama(
+    stream: Iterator["ChatResponse"], stop_when: StopPredicate = None
+) -> "ChatResponse":
+    """
+    Consume a streamed Ollama chat response, closing the stream as soon as
+    `stop_when` holds for the text received so far.
+
+    :param stream: Iterator as returned by Client.chat(..., stream=True).
+    :type stream: Iterator[ChatResponse]
+    :param stop_when: Predicate on the accumulated text; None to read everything.
+    :type stop_when: Optional[Callable[[str], bool]]
+    :return: A chat response containing exactly the text received. Its done reason
+        is EARLY_STOP if the stream was cancelled.
+    :rtype: ChatResponse
+    """
+    collector = _Collector(stop_when)
+    last = None
+
+    try:
+        for last in stream:
+            if collector.add(last.message.content):
+                break
+    finally:
+        stream.close()
+
+    return _ollama_response(last, collector)
+
+
+async def acollect_ollama(
+    stream: AsyncIterator["ChatResponse"], stop_when: StopPredicate = None
+) -> "ChatResponse":
+    """
+    Asynchronous version of collect_ollama.
+    """
+    collector = _Collector(stop_when)
+    last = None
+
+    try:
+        async for last in stream:
+            if collector.add(last.message.content):
+                break
+    finally:
+        await stream.aclose()
+
+    return _ollama_response(last, collector)
@@ -1,3 +1,6 @@
+import json
+import os
+import pickle
 from pathlib import Path
 from typing import Any
 
@@ -17,14 +20,22 @@ def total_cost(experiment: str) -> float:
         The total cost of the experiment in USD.
 
     This function iterates through all the pickled files in the output directory
-    for the given experiment, summing up the costs.
+    for the given experiment, summing up the costs. The usage summary saved next
+    to each pickle is read instead of the pickle itself, so threads are only
+    deserialized if they were saved without one.
     """
     usd: float = 0.0
     path: Path = Path(os.path.join("out", experiment))
 
     for outfile in sorted(path.glob("**/*.pkl")):
-        with open(outfile, "rb") as pkl:
-            thr: Any = pickle.load(pkl)
-            usd += thr.cost()
+        sidecar: Path = outfile.with_suffix(".usage.json")
+
+        if sidecar.exists():
+            with open(sidecar) as fp:
+                usd += json.load(fp)["cost"]
+        else:
+            with open(outfile, "rb") as pkl:
+                thr: Any = pickle.load(pkl)
+                usd += thr.cost()
 
     return usd
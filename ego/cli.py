@@ -28,7 +28,42 @@ def main():
     type=(str, int),
     help="Optional parameters for scenario.",
 )
-def run(scenario, times, param):
+@click.option(
+    "--shard",
+    default=None,
+    help="Run only shard i of N (given as i/N), e.g., in one of N processes.",
+)
+@click.option(
+    "--experiment",
+    default=None,
+    help="Experiment ID, required with --shard (the same for all shards).",
+)
+def run(scenario, times, param, shard, experiment):
+    if shard is not None:
+        from alter_ego.experiment import sharding
+
+        if experiment is None:
+            raise click.UsageError("--shard requires --experiment.")
+
+        try:
+            shard = sharding.Shard.parse(shard)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--shard")
+
+        sharding.set_shard(shard, experiment)
+        sharding.write_manifest(
+            experiment,
+            shard,
+            scenario=scenario,
+            times=times,
+            param=dict(param),
+            finished=False,
+        )
+    elif experiment is not None:
+        from alter_ego.experiment import sharding
+
+        sharding.set_shard(None, experiment)
+
     if scenario.isidentifier():
         try:
             scenario = importlib.import_module(f"scenarios.{scenario}")
@@ -39,10 +74,27 @@ def run(scenario, times, param):
             scenario = loader.load_module()
 
         scenario.run(times=times, **dict(param))
+
+        if shard is not None:
+            sharding.write_manifest(experiment, shard, finished=True)
     else:
         raise ValueError("Invalid scenario.")
 
 
+@main.command(help="Merge the shards of an experiment run with --shard.")
+@click.argument("experiment")
+@click.option("--force", is_flag=True, help="Merge even if shards are incomplete.")
+def merge(experiment, force):
+    from alter_ego.experiment import sharding
+
+    try:
+        n = sharding.merge(experiment, force=force)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    print(f"Merged {n} shards into out/{experiment}.", file=sys.stderr)
+
+
 @main.command(help="Export experimental data to stdout.")
 @click.argument("scenario")
 @click.argument("experiment")
@@ -93,5 +145,62 @@ def data(scenario, experiment):
         raise ValueError("Invalid scenario.")
 
 
+@main.command(help="Serve a mock OpenAI/Ollama-compatible API for offline testing.")
+@click.option("--host", default="127.0.0.1", help="Interface to listen on.")
+@click.option("--port", default=8000, type=int, help="Port to listen on.")
+@click.option(
+    "--latency", default=0.0, type=float, help="Mean latency of responses in seconds."
+)
+@click.option(
+    "--jitter", default=0.0, type=float, help="Maximum deviation from mean latency."
+)
+@click.option(
+    "--error-rate", default=0.0, type=float, help="Probability of HTTP 500 errors."
+)
+@click.option(
+    "--rate-limit-rate",
+    default=0.0,
+    type=float,
+    help="Probability of HTTP 429 errors.",
+)
+@click.option(
+    "--response",
+    multiple=True,
+    help="Scripted response (repeatable, cycled). Messages are echoed by default.",
+)
+@click.option("--randomize", is_flag=True, help="Draw scripted responses at random.")
+@click.option("--seed", default=None, type=int, help="Random seed.")
+def mock(
+    host,
+    port,
+    latency,
+    jitter,
+    error_rate,
+    rate_limit_rate,
+    response,
+    randomize,
+    seed,
+):
+    from alter_ego.utils.mockserver import MockServer
+    from alter_ego.utils.simulation import Simulator
+
+    simulator = Simulator(
+        latency=(max(0.0, latency - jitter), latency + jitter) if jitter else latency,
+        error_rate=error_rate,
+        rate_limit_rate=rate_limit_rate,
+        responses=list(response) or None,
+        randomize=randomize,
+        seed=seed,
+    )
+    server = MockServer(simulator, host, port)
+
+    print(f"Serving mock API on {server.url}.", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     main()
@@ -105,7 +105,7 @@ def run(times: int = 1) -> None:
     treatments = [make_treatment(definition, t) for t in definition["treatments"]]
     e = alter_ego.experiment.Experiment(*treatments)
 
-    for i in range(1, times + 1):
+    for i in e.replications(times):
         threads = []
 
         for i_, thrstr in definition["threads"]:
@@ -116,7 +116,7 @@ def run(times: int = 1) -> None:
 
         convo = alter_ego.structure.Conversation(*threads)
 
-        e.link(convo)  # randomly assign treatment
+        e.link(convo, replication=i)  # randomly assign treatment
 
         convo.all.rounds = definition["rounds"]
 
@@ -146,7 +146,7 @@ def run(times: int = 1) -> None:
             traceback.print_exception(*sys.exc_info())
             convo.all.tainted = True
 
-        convo.all.save(e.id)
+        convo.all.save(e.subdir)
         print(file=sys.stderr)
 
     print(f"Experiment {e.id} OK", file=sys.stderr)
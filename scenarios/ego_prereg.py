@@ -1,6 +1,5 @@
 import json
 import os
-import random
 import sys
 import time
 from typing import Any
@@ -8,6 +7,7 @@ from typing import Any
 import alter_ego.agents
 import alter_ego.experiment
 import alter_ego.structure
+import alter_ego.utils.records
 
 from games import pd
 from games.pd import treatments
@@ -31,17 +31,17 @@ def run(times: int, model: str) -> None:
     This function initializes agents, runs conversations, and handles exceptions.
     """
     print("Note: This scenario runs as per the preregistration, ignoring --times/-n.")
-    os.mkdir(f"out/{e.id}")
+    os.makedirs(f"out/{e.subdir}", exist_ok=True)
 
     pairs_per_frame: int = 200
     rounds: int = 10
 
     t = list(e.treatments) * pairs_per_frame  # balanced treatment assignment
-    random.shuffle(t)
+    e.rng("assignment").shuffle(t)  # the same in all shards
 
     replications: int = len(t)
 
-    for i in range(replications):
+    for i in e.replications(replications):
         while True:
             try:
                 a1 = alter_ego.agents.GPTThread(
@@ -53,19 +53,19 @@ def run(times: int, model: str) -> None:
 
                 convo = alter_ego.structure.Conversation(a1, a2)
 
-                e.link(convo, t[i])
+                e.link(convo, t[i], replication=i)
 
                 print(f"Replication {i+1} of {replications}.", file=sys.stderr)
 
                 pd.iterated(convo, rounds)
 
-                convo.all.save(e.id)
+                convo.all.save(e.subdir)
                 break
             except RuntimeError:
                 print("RuntimeError occurred. Retrying.", file=sys.stderr)
 
                 convo.all.tainted = True
-                convo.all.save(e.id)
+                convo.all.save(e.subdir)
 
                 time.sleep(15)
 
@@ -82,7 +82,11 @@ def export(thread: alter_ego.agents.GPTThread) -> list[dict]:
     )
 
     if not thread.tainted:
-        min_time = min(e.created for e in thread.log if hasattr(e, "created"))  # HACK
+        min_time = min(
+            t
+            for entry in thread.log
+            if (t := alter_ego.utils.records.timestamp(entry)) is not None
+        )
 
         for choice in thread.choices:
             data.append(row_template | choice | dict(min_time=min_time))
@@ -1,5 +1,4 @@
 import os
-import random
 import sys
 import textwrap
 import time
@@ -47,7 +46,7 @@ def run(times: int = 1) -> None:
     This function initializes agents, runs conversations, and handles exceptions.
     """
     # Do `times` experiments/sessions/runs
-    for i in range(times):
+    for i in e.replications(times):
         try:
             agent = alter_ego.agents.CLIThread(
                 name="AI",
@@ -61,7 +60,7 @@ def run(times: int = 1) -> None:
             convo = alter_ego.structure.Conversation(agent)
 
             # Assign treatment to this conversation
-            e.link(convo)
+            e.link(convo, replication=i)
 
             print(f"Replication {i+1} of {times}.", file=sys.stderr)
 
@@ -72,7 +71,7 @@ def run(times: int = 1) -> None:
             alter_ego.utils.exclusive_response(agent.submit(PROMPTS.THINK), ["OK"])
 
             # Obtain random number
-            agent.number = random.randint(1, 10)
+            agent.number = e.rng(i, "number").randint(1, 10)
 
             # Ask AI about number, second stage
             agent.response = alter_ego.utils.exclusive_response(
@@ -87,6 +86,6 @@ def run(times: int = 1) -> None:
             convo.all.tainted = True
         finally:
             # Save original outputs
-            convo.all.save(e.id)
+            convo.all.save(e.subdir)
 
     print(f"Experiment {e.id} OK", file=sys.stderr)